@@ -0,0 +1,59 @@
+from app.settings import Settings, settings as default_settings
+from app.services.base_validation_service import BaseValidationService
+from app.services.favourites_service import FavouritesService
+from app.services.games_service import GamesService
+from app.services.home_service import HomeService
+from app.services.match_service import MatchService
+from app.services.recom_service import RecomService
+from app.services.user_login_service import UserLoginService
+
+# Application-scoped services, built on first use and shared by every request. The services
+# keep no per-request state. The providers are async so FastAPI calls them on the event loop
+# rather than in its threadpool. A harness swaps in fakes with app.dependency_overrides, e.g.
+#   app.dependency_overrides[get_match_service] = lambda: FakeMatchService()
+
+_services = {}
+
+
+def _service(service_class):
+    service = _services.get(service_class)
+    if service is None:
+        service = _services[service_class] = service_class()
+    return service
+
+
+def reset_services():
+    # drops the built services, e.g. after a harness has replaced module-level defaults
+    _services.clear()
+
+
+async def get_settings() -> Settings:
+    return default_settings
+
+
+async def get_validation_service() -> BaseValidationService:
+    return _service(BaseValidationService)
+
+
+async def get_games_service() -> GamesService:
+    return _service(GamesService)
+
+
+async def get_match_service() -> MatchService:
+    return _service(MatchService)
+
+
+async def get_favourites_service() -> FavouritesService:
+    return _service(FavouritesService)
+
+
+async def get_recom_service() -> RecomService:
+    return _service(RecomService)
+
+
+async def get_user_login_service() -> UserLoginService:
+    return _service(UserLoginService)
+
+
+async def get_home_service() -> HomeService:
+    return _service(HomeService)
@@ -1,13 +1,60 @@
 
+import logging
+from contextlib import asynccontextmanager
+
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+# it loads from the .env file, before the app modules read their settings
+load_dotenv()
+
+from app.routers import games, match_requests, favourites, user_login, recommendations, home, admin
+from app.settings import settings
+from app.services.activity_queue import activity_queue
+from app.services.base_validation_service import jwt_verifier, token_cache
+from app.services.game_catalogue import game_catalogue
+from app.services.game_search import game_search
+from app.services.games_service import games_response_cache
+from app.services.match_status_broadcaster import match_status_broadcaster
+from app.services.page_prefetcher import page_prefetcher
+from app.services.recommendations_cache import recommendations_cache
+from app.utils.http_clients import http_clients
+from app.utils.metrics import metrics
+from app.utils.profiling import loop_monitor, request_profiler
+from framework.metrics.collectors import (cache_collector, prefetch_collector, queue_collector,
+                                          search_index_collector, upstream_collector)
+from framework.metrics.upstream_metrics import UpstreamMetrics
+from framework.middleware.compression_middleware import CompressionMiddleware
+from framework.middleware.deadline_middleware import DeadlineMiddleware
+from framework.middleware.profiling_middleware import RequestProfilingMiddleware
+from framework.middleware.timing_middleware import TimingMiddleware
+from framework.serialization.json_response import FastJSONResponse
+
 
-from app.routers import games, match_requests, favourites, user_login, recommendations
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    if jwt_verifier is not None:
+        await jwt_verifier.start()
+    activity_queue.start()
+    game_search.start()
+    if loop_monitor is not None:
+        loop_monitor.start()
+    yield
+    if loop_monitor is not None:
+        await loop_monitor.close()
+    await game_search.close()
+    await page_prefetcher.close()
+    await match_status_broadcaster.close()
+    await activity_queue.close(timeout=settings.activity.flush_timeout)
+    if jwt_verifier is not None:
+        await jwt_verifier.stop()
+    await http_clients.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,18 +64,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# it loads from the .env file
-load_dotenv()
+if settings.server.compression_enabled:
+    app.add_middleware(CompressionMiddleware, registry=metrics,
+                       minimum_size=settings.server.compression_minimum_size,
+                       gzip_level=settings.server.compression_gzip_level,
+                       brotli_quality=settings.server.compression_brotli_quality)
+app.add_middleware(DeadlineMiddleware, default_timeout=settings.server.request_deadline_seconds)
+app.add_middleware(TimingMiddleware, registry=metrics, sample_rate=settings.server.metrics_timing_sample_rate)
+if settings.profiling.admin_token is not None:
+    app.add_middleware(RequestProfilingMiddleware, profiler=request_profiler, token=settings.profiling.admin_token)
+
+http_clients.add_hook(UpstreamMetrics(metrics))
+metrics.register_collector(cache_collector({"token": token_cache,
+                                            "game": game_catalogue.cache,
+                                            "games_response": games_response_cache,
+                                            "recommendations": recommendations_cache,
+                                            "prefetch": page_prefetcher}))
+metrics.register_collector(upstream_collector(http_clients))
+metrics.register_collector(queue_collector({"user_activity": activity_queue}))
+metrics.register_collector(search_index_collector({"games": game_search}))
+metrics.register_collector(prefetch_collector({"pages": page_prefetcher}))
 
 app.include_router(user_login.router)
 app.include_router(games.router)
 app.include_router(match_requests.router)
 app.include_router(favourites.router)
 app.include_router(recommendations.router)
+app.include_router(home.router)
+app.include_router(admin.router)
 
 @app.get("/health")
 async def health():
     return {"message": "Service is up and running"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    uvicorn.run(app, port=8000)
+    # WEB_CONCURRENCY > 1 runs that many worker processes; SIGHUP restarts them one by one.
+    # Workers and reload need the app as an import string.
+    server = settings.server
+    if server.workers > 1 and settings.cache.backend == "memory":
+        logging.getLogger(__name__).warning(
+            "CACHE_BACKEND=memory with %d workers: after a logout the other workers accept the token "
+            "for up to TOKEN_CACHE_TTL (%ss)", server.workers, settings.cache.token_ttl)
+    uvicorn.run("app.main:app" if server.workers > 1 or server.reload else app,
+                host=server.host,
+                port=server.port,
+                workers=None if server.reload else server.workers,
+                reload=server.reload,
+                timeout_graceful_shutdown=server.graceful_shutdown_seconds)
@@ -0,0 +1,20 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from app.models.game import GameResponse
+from app.models.match import MatchResponses
+
+class DegradedSection(BaseModel):
+    section: str
+    reason: str  # Possible values: "timeout", "error"
+    statusCode: Optional[int] = None
+    detail: Optional[str] = None
+
+class HomeResponse(BaseModel):
+    userId: str
+    # every game shown on the screen, once, by gameId; the sections list the ids
+    games: Dict[str, GameResponse]
+    recommendations: Optional[List[str]] = None
+    favourites: Optional[List[str]] = None
+    matchRequests: Optional[MatchResponses] = None
+    # the sections left out (null above) because they failed or did not finish in time
+    degraded: List[DegradedSection] = []
@@ -34,4 +34,28 @@ class MatchInitiate(BaseModel):
 class MatchInitiateResponse(BaseModel):
     message: str
     matchRequestId : str
-    polling_url : str
\ No newline at end of file
+    polling_url : str
+
+class MatchRequestBatch(BaseModel):
+    matchRequests: List[MatchRequest]
+
+class MatchRequestBatchItem(BaseModel):
+    index: int
+    statusCode: int
+    matchRequest: Optional[MatchResponse] = None
+    detail: Optional[str] = None
+
+class MatchRequestBatchResponse(BaseModel):
+    results: List[MatchRequestBatchItem]
+
+class MatchStatusBatchRequest(BaseModel):
+    matchRequestIds: List[str]
+
+class MatchStatusBatchItem(BaseModel):
+    matchRequestId: str
+    statusCode: int
+    matchStatus: Optional[MatchStatus] = None
+    detail: Optional[str] = None
+
+class MatchStatusBatchResponse(BaseModel):
+    results: List[MatchStatusBatchItem]
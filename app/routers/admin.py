@@ -0,0 +1,80 @@
+import hmac
+import time
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import PlainTextResponse
+
+from app.settings import settings
+from app.utils.profiling import request_profiler
+from framework.profiling.loop_monitor import LoopLagMonitor
+from framework.profiling.sampler import StackSampler
+from framework.profiling.stacks import collapse
+
+PROFILING = settings.profiling
+
+# one process-wide profile or lag measurement at a time
+profile_lock = asyncio.Lock()
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # without ADMIN_TOKEN the admin endpoints do not exist
+    if PROFILING.admin_token is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), PROFILING.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", include_in_schema=False, dependencies=[Depends(require_admin)])
+
+
+def folded_response(folded, name):
+    return PlainTextResponse(folded, headers={
+        "Content-Disposition": f'attachment; filename="{name}-{int(time.time())}.folded"'})
+
+
+def check_seconds(seconds):
+    if not 0 < seconds <= PROFILING.max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILING.max_seconds}")
+
+
+@router.get("/profile")
+async def profile(seconds: float = 10.0):
+    check_seconds(seconds)
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        samples = await StackSampler(PROFILING.sample_interval).run(seconds)
+    return folded_response(collapse(samples), "iris-profile")
+
+
+@router.get("/loop-lag")
+async def loop_lag(seconds: float = 10.0, format: str = "json"):
+    check_seconds(seconds)
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        monitor = LoopLagMonitor(PROFILING.loop_monitor_interval, PROFILING.loop_lag_threshold)
+        monitor.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await monitor.close()
+    report = monitor.report()
+    if format == "folded":
+        return folded_response(report["stacks"], "iris-loop-blocked")
+    return report
+
+
+@router.get("/profiles")
+async def request_profiles():
+    return [profile.summary() for profile in reversed(request_profiler.profiles.values())]
+
+
+@router.get("/profiles/{profile_id}")
+async def request_profile(profile_id: str):
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded_response(profile.folded(), f"iris-request-{profile_id}")
@@ -2,31 +2,34 @@ from fastapi import APIRouter, Query, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from app.models.response import ErrorResponse
 from app.models.favourite import FavouriteResponse, FavouriteRequest, FavouritesResponse
+from app.dependencies import get_favourites_service
 from app.services.favourites_service import FavouritesService
 from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit
+from framework.metrics.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("favourites"))])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/favourite", response_model=FavouriteResponse,
          responses={201: {"model": FavouriteResponse},401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def add_favourite(favourite_request: FavouriteRequest, token: str = Depends(oauth2_scheme)):
+async def add_favourite(favourite_request: FavouriteRequest, token: str = Depends(oauth2_scheme),
+                        favourite_service: FavouritesService = Depends(get_favourites_service)):
     try:
-        favourite_service = FavouritesService()
         favourite_response = await favourite_service.add_favourite(token, favourite_request)
         return favourite_response
 
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 @router.get("/favourites", response_model=FavouritesResponse,
          responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def get_favourites(page: int = 1,page_size: int = 5, token: str = Depends(oauth2_scheme)):
+async def get_favourites(page: int = 1,page_size: int = 5, token: str = Depends(oauth2_scheme),
+                         favourites_service: FavouritesService = Depends(get_favourites_service)):
     try:
-        games_service = FavouritesService()
-        games_response = await games_service.get_favourites(token, page, page_size)
-        return games_response
+        favourites_response = await favourites_service.get_favourites(token, page, page_size)
+        return favourites_response
 
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
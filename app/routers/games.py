@@ -1,50 +1,55 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Header
 from typing import Optional
 from app.models.game import GameResponse, GamesResponse
 from app.models.response import ErrorResponse
 from fastapi.security import OAuth2PasswordBearer
 
+from app.dependencies import get_games_service
 from app.services.games_service import GamesService
 from app.services.user_login_service import UserLoginService
+from framework.cache.response_cache import cached_response
 from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit, TOKEN
+from framework.metrics.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("games", key=TOKEN))])
 
 # OAuth2 setup for token handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 @router.get("/games/{game_id}", response_model=GameResponse,
-            responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+            responses={304: {"description": "Not Modified"}, 401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
 async def games(game_id: Optional[str] = None,
-                token: str = Depends(oauth2_scheme)):
+                token: str = Depends(oauth2_scheme),
+                if_none_match: Optional[str] = Header(None),
+                games_service: GamesService = Depends(get_games_service)):
     try:
-        games_service = GamesService()
-        games_response = await games_service.get_game(token, game_id)
-        return games_response
+        games_response = await games_service.get_game_cached(token, game_id)
+        return cached_response(games_response, if_none_match)
 
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 
 @router.get("/games", response_model=GamesResponse,
-         responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+         responses={304: {"description": "Not Modified"}, 401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
 async def games(
         page: int = 1,
         page_size: int = 10,
         title: Optional[str] = None,
         game_id: Optional[str] = None,
         genre : Optional[str] = None,
-        token: str = Depends(oauth2_scheme)
+        token: str = Depends(oauth2_scheme),
+        if_none_match: Optional[str] = Header(None),
+        games_service: GamesService = Depends(get_games_service)
 ):
     try:
-        games_service = GamesService()
-        games_response = await games_service.get_games(token, page, page_size, title, game_id, genre)
-        return games_response
+        games_response = await games_service.get_games_cached(token, page, page_size, title, game_id, genre)
+        return cached_response(games_response, if_none_match)
 
     except ResponseException as e:
-        print(e)
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 
 
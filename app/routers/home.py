@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.security import OAuth2PasswordBearer
+
+from app.models.home import HomeResponse
+from app.models.response import ErrorResponse
+from app.dependencies import get_home_service
+from app.services.home_service import HomeService
+from app.routers.recommendations import MAX_NUM_RECOMS
+from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit
+from framework.metrics.request_timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("home"))])
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+@router.get("/home", response_model=HomeResponse,
+         responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def get_home(num_recoms: int = Query(6, ge=1, le=MAX_NUM_RECOMS), page_size: int = 5, token: str = Depends(oauth2_scheme),
+                   home_service: HomeService = Depends(get_home_service)):
+    try:
+        home_response = await home_service.get_home(token, num_recoms, page_size)
+        return home_response
+
+    except ResponseException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
@@ -1,27 +1,41 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 from app.models.match import MatchRequest, MatchResponses, MatchResponseWithLinks, MatchStatus
 from app.models.match import MatchInitiate, MatchResponse, MatchInitiateResponse
+from app.models.match import MatchRequestBatch, MatchRequestBatchResponse, MatchStatusBatchRequest, MatchStatusBatchResponse
 from app.models.response import ErrorResponse
+from app.dependencies import get_match_service
+from app.settings import settings
 from app.services.match_service import MatchService
 from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit
+from framework.metrics.request_timing import TimedRoute
+from framework.resilience import deadline
+from framework.serialization.json_response import passthrough_response
+from framework.utils.sse import format_sse, sse_comment
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("match_requests"))])
 
 # OAuth2 setup for token handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+SSE_HEARTBEAT_SECONDS = settings.match.status_heartbeat
+MAX_STATUS_WAIT_SECONDS = settings.match.status_max_wait
+
+# status polling gets its own, tighter limit on top of the router's
+match_status_rate_limit = rate_limit("match_status", rate=2.0, burst=10.0)
+
 @router.get("/match-requests/{match_request_id}", response_model=MatchResponseWithLinks,
          responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def match_requests(match_request_id: str, token: str = Depends(oauth2_scheme)):
+async def match_requests(match_request_id: str, token: str = Depends(oauth2_scheme),
+                         match_service: MatchService = Depends(get_match_service)):
     try:
-        match_service = MatchService()
         match_response = await match_service.get_match_request(token, match_request_id)
-        return match_response
+        return passthrough_response(match_response)
     except ResponseException as e:
-        print(e)
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 @router.get("/match-requests", response_model=MatchResponses,
          responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
@@ -29,41 +43,95 @@ async def match_requests(
         page: int = 1,
         page_size: int = 10,
         game_id: Optional[str] = None,
-        token: str = Depends(oauth2_scheme)
+        token: str = Depends(oauth2_scheme),
+        match_service: MatchService = Depends(get_match_service)
 ):
     try:
-        match_service = MatchService()
         match_responses = await match_service.get_match_requests(token, page, page_size, game_id)
-        return match_responses
+        return passthrough_response(match_responses)
     except ResponseException as e:
-        print(e)
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 @router.post("/match-requests", response_model=MatchResponse,
          responses={201: {"model": MatchResponse}, 401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def match_requests(match_request: MatchRequest, token: str = Depends(oauth2_scheme)):
+async def match_requests(match_request: MatchRequest, token: str = Depends(oauth2_scheme),
+                         match_service: MatchService = Depends(get_match_service)):
     try:
-        match_service = MatchService()
         match_response = await match_service.create_match_request(token, match_request)
         return match_response
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
+
+@router.post("/match-requests/batch", response_model=MatchRequestBatchResponse,
+             responses={401: {"model": ErrorResponse}, 422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def match_requests_batch(match_request_batch: MatchRequestBatch, token: str = Depends(oauth2_scheme),
+                               match_service: MatchService = Depends(get_match_service)):
+    try:
+        batch_response = await match_service.create_match_requests(token, match_request_batch.matchRequests)
+        return batch_response
+    except ResponseException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 @router.post("/match-requests/match", response_model=MatchInitiateResponse,
              responses = {202: {"model":MatchInitiateResponse}, 401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def initiate_match(match_request_initiate: MatchInitiate, token: str = Depends(oauth2_scheme) ):
+async def initiate_match(match_request_initiate: MatchInitiate, token: str = Depends(oauth2_scheme),
+                         match_service: MatchService = Depends(get_match_service)):
     try:
-        match_service = MatchService()
         match_responses = await match_service.initiate_match(token, match_request_initiate)
         return match_responses
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
-@router.get("/match/status/{match_request_id}", response_model=MatchStatus)
-async def get_matchmaking_status(match_request_id: str, token: str = Depends(oauth2_scheme)):
+@router.get("/match/status/{match_request_id}", response_model=MatchStatus,
+            dependencies=[Depends(match_status_rate_limit)])
+async def get_matchmaking_status(
+        match_request_id: str,
+        wait: Optional[float] = Query(None, ge=0, description="Seconds to hold the request open until the status changes"),
+        last_status: Optional[str] = Query(None, description="Status the caller already has"),
+        token: str = Depends(oauth2_scheme),
+        match_service: MatchService = Depends(get_match_service)
+):
     try:
-        match_service = MatchService()
-        match_responses = await match_service.get_match_status(token, match_request_id)
+        if wait:
+            match_responses = await match_service.wait_for_match_status(token, match_request_id,
+                                                                        last_status=last_status,
+                                                                        wait=min(wait, MAX_STATUS_WAIT_SECONDS))
+        else:
+            match_responses = await match_service.get_match_status(token, match_request_id)
         return match_responses
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
\ No newline at end of file
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
+
+
+@router.post("/match/status/batch", response_model=MatchStatusBatchResponse,
+             dependencies=[Depends(match_status_rate_limit)],
+             responses={401: {"model": ErrorResponse}, 422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def get_matchmaking_statuses(status_batch: MatchStatusBatchRequest, token: str = Depends(oauth2_scheme),
+                                   match_service: MatchService = Depends(get_match_service)):
+    try:
+        batch_response = await match_service.get_match_statuses(token, status_batch.matchRequestIds)
+        return batch_response
+    except ResponseException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
+
+async def match_status_events(statuses):
+    # the stream stays open for as long as the client listens, past the request deadline
+    deadline.clear_deadline()
+    async for status in statuses:
+        if status is None:
+            yield sse_comment("keep-alive")
+        else:
+            yield format_sse(status.model_dump_json(), event="status")
+
+@router.get("/match/status/{match_request_id}/stream", response_class=StreamingResponse,
+            dependencies=[Depends(match_status_rate_limit)],
+            responses={200: {"content": {"text/event-stream": {}}}, 401: {"model": ErrorResponse},
+                       404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def stream_matchmaking_status(match_request_id: str, token: str = Depends(oauth2_scheme),
+                                    match_service: MatchService = Depends(get_match_service)):
+    try:
+        statuses = await match_service.watch_match_status(token, match_request_id, heartbeat=SSE_HEARTBEAT_SECONDS)
+    except ResponseException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
+    return StreamingResponse(match_status_events(statuses), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
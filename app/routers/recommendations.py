@@ -3,32 +3,36 @@ from fastapi.security import OAuth2PasswordBearer
 
 from app.models.recom_models import Recommendations, UserActivityResponse, UserActivityRequest
 from app.models.response import ErrorResponse
+from app.dependencies import get_recom_service
 from app.services.recom_service import RecomService
 from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit
+from framework.metrics.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("recommendations"))])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-@router.post("/user_activity", response_model=UserActivityResponse,
-         responses={201: {"model": UserActivityResponse},401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def mark_activity(user_activity_request: UserActivityRequest, token: str = Depends(oauth2_scheme)):
+MAX_NUM_RECOMS = 100
+
+@router.post("/user_activity", response_model=UserActivityResponse, status_code=202,
+         responses={401: {"model": ErrorResponse}, 503: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def mark_activity(user_activity_request: UserActivityRequest, token: str = Depends(oauth2_scheme),
+                        recom_service: RecomService = Depends(get_recom_service)):
     try:
-        favourite_service = RecomService()
-        favourite_response = await favourite_service.perform_activity(token, user_activity_request)
-        return favourite_response
+        activity_response = await recom_service.perform_activity(token, user_activity_request)
+        return activity_response
 
     except ResponseException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
 
 @router.get("/recommendations", response_model=Recommendations,
          responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def get_recommendations(num_recoms: int = 6, token: str = Depends(oauth2_scheme)):
+async def get_recommendations(num_recoms: int = Query(6, ge=1, le=MAX_NUM_RECOMS), token: str = Depends(oauth2_scheme),
+                              recom_service: RecomService = Depends(get_recom_service)):
     try:
-        recom_service = RecomService()
         recoms_response = await recom_service.get_recommendations(token, num_recoms)
         return recoms_response
 
     except ResponseException as e:
-        print(e)
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
@@ -3,31 +3,33 @@ from app.models.login import LoginResponse
 from app.models.response import ErrorResponse, MessageResponse
 from fastapi.security import OAuth2PasswordBearer
 
+from app.dependencies import get_user_login_service
 from app.services.user_login_service import UserLoginService
 from framework.exceptions.response_exceptions import ResponseException
+from app.utils.rate_limits import rate_limit, ADDRESS
+from framework.metrics.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(rate_limit("login", key=ADDRESS))])
 
 # OAuth2 setup for token handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/login", response_model=LoginResponse, responses={400: {"model": ErrorResponse}})
-async def login(fire_base_token: str = Depends(oauth2_scheme)):
+async def login(fire_base_token: str = Depends(oauth2_scheme),
+                user_login_service: UserLoginService = Depends(get_user_login_service)):
     try:
-        user_login_service = UserLoginService()
         response = await user_login_service.login(fire_base_token)
         return response
 
     except ResponseException as err:
-        raise HTTPException(status_code=err.status_code, detail=err.message)
+        raise HTTPException(status_code=err.status_code, detail=err.message, headers=err.headers)
 
 @router.post("/logout", response_model=MessageResponse, responses={401: {"model": ErrorResponse}})
-async def logout(token: str = Depends(oauth2_scheme)):
+async def logout(token: str = Depends(oauth2_scheme),
+                 user_login_service: UserLoginService = Depends(get_user_login_service)):
     try:
-        user_login_service = UserLoginService()
         message = await user_login_service.logout(token)
         return message
 
     except ResponseException as err:
-        print(err)
-        raise HTTPException(status_code=err.status_code, detail=err.message)
\ No newline at end of file
+        raise HTTPException(status_code=err.status_code, detail=err.message, headers=err.headers)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import logging
+
+from app.settings import settings
+from app.services.recommendations_cache import recommendations_cache
+from app.utils.http_clients import http_clients as default_http_clients, RECOM
+from framework.exceptions.response_exceptions import ResponseException
+from framework.queues.write_behind import WriteBehindQueue
+from framework.utils.fan_out import bounded_gather
+
+logger = logging.getLogger(__name__)
+
+class ActivityPublisher:
+    # The write-behind sink for activity events. Posts a batch to the bulk endpoint, or one
+    # event at a time if the recommendation service does not have it.
+
+    def __init__(self, http_clients=None, batch_path="/user_activity/batch", concurrency=8, on_delivered=None):
+        self.http_clients = http_clients or default_http_clients
+        self.batch_path = batch_path
+        self.concurrency = concurrency
+        # called with the activities the recommendation service accepted
+        self.on_delivered = on_delivered
+
+    async def __call__(self, activities):
+        # returns the activities to retry
+        client = self.http_clients.get(RECOM)
+        if self.batch_path:
+            response = await client.post(self.batch_path, json={"activities": activities})
+            if response.status_code < 300:
+                self._delivered(activities)
+                return []
+            if response.status_code not in (404, 405):
+                raise ResponseException(status_code=response.status_code, message="Error adding user_activity batch")
+            logger.info("%s is not available, posting activities one by one", self.batch_path)
+            self.batch_path = None
+
+        results = await bounded_gather([client.post("/user_activity", json=activity) for activity in activities],
+                                       self.concurrency)
+        retry, delivered = [], []
+        for activity, result in zip(activities, results):
+            if isinstance(result, Exception) or result.status_code >= 500 or result.status_code == 429:
+                retry.append(activity)
+            elif result.status_code >= 300:
+                logger.warning("Dropping activity rejected with %s: %s", result.status_code, activity)
+            else:
+                delivered.append(activity)
+        self._delivered(delivered)
+        return retry
+
+    def _delivered(self, activities):
+        if self.on_delivered is not None and activities:
+            self.on_delivered(activities)
+
+
+def refresh_recommendations(activities):
+    # the recommender has new signals for these users
+    for user_id in {activity["userId"] for activity in activities}:
+        recommendations_cache.refresh(user_id)
+
+
+# started and flushed by the app lifespan
+activity_queue = WriteBehindQueue(ActivityPublisher(batch_path=settings.activity.batch_path,
+                                                    on_delivered=refresh_recommendations),
+                                  max_size=settings.activity.queue_size,
+                                  batch_size=settings.activity.batch_size,
+                                  flush_interval=settings.activity.flush_interval,
+                                  max_retries=settings.activity.max_retries,
+                                  spill_path=settings.activity.spill_path,
+                                  name="user_activity")
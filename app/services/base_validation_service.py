@@ -1,24 +1,132 @@
-import os
-import httpx
+import time
+import hashlib
+from app.settings import settings
+from app.services.game_catalogue import game_catalogue as default_game_catalogue
+from app.utils.caches import build_cache
+from app.utils.http_clients import http_clients as default_http_clients, USER_VALIDATION
+from framework.auth.jwt_verifier import JwtVerifier
+from framework.auth.key_sources import FileKeySource, EnvKeySource
 from framework.exceptions.response_exceptions import ResponseException
+from framework.metrics.request_timing import timed
+from framework.utils.fan_out import gather_or_cancel
+from framework.utils.single_flight import SingleFlight
+
+SEQUENTIAL = "sequential"
+PARALLEL = "parallel"
+OPTIMISTIC = "optimistic"
+
+# How validate_token_alongside runs the token validation, the request checks and optimistic reads
+fan_out_mode = settings.match.fan_out_mode
+
+# token -> user_id, shared by every service instance in the process
+token_cache = build_cache("tokens", max_size=settings.cache.token_max_size, ttl=settings.cache.token_ttl)
+token_validations = SingleFlight()
+
+
+def build_jwt_verifier():
+    auth = settings.auth
+    if not auth.local_token_verification:
+        return None
+    key_source = FileKeySource(auth.jwt_keys_file) if auth.jwt_keys_file else EnvKeySource("JWT_KEYS")
+    return JwtVerifier(key_source,
+                       algorithms=auth.jwt_algorithms,
+                       audience=auth.jwt_audience,
+                       issuer=auth.jwt_issuer,
+                       user_id_claim=auth.jwt_user_id_claim,
+                       refresh_interval=auth.jwt_keys_refresh_seconds,
+                       leeway=auth.jwt_leeway_seconds,
+                       revoked=build_cache("revoked_tokens", max_size=auth.jwt_max_revocations,
+                                           ttl=86400.0, clock=time.time))
+
+# None unless LOCAL_TOKEN_VERIFICATION is on; started and stopped by the app lifespan
+jwt_verifier = build_jwt_verifier()
+
+
+def token_cache_key(token):
+    # keep digests rather than raw bearer tokens in memory
+    return hashlib.sha256(token.encode()).hexdigest()
+
 
 class BaseValidationService:
 
+    def __init__(self, http_clients=None, game_catalogue=None):
+        self.http_clients = http_clients or default_http_clients
+        self.game_catalogue = game_catalogue or default_game_catalogue
+
+    async def validate_game(self, game_id):
+        with timed("game_check"):
+            return await self.game_catalogue.exists(game_id)
+
+    async def resolve_user_id(self, token):
+        with timed("validation"):
+            return await self._resolve_user_id(token)
+
+    async def _resolve_user_id(self, token):
+        if jwt_verifier is not None:
+            user_id = jwt_verifier.verify(token)
+            if user_id is not None:
+                return user_id
+
+        key = token_cache_key(token)
+        user_id = token_cache.get(key)
+        if user_id is not None:
+            return user_id
+        return await token_validations.do(key, lambda: self._validate_token_remote(token, key))
+
+    async def _validate_token_remote(self, token, key):
+        client = self.http_clients.get(USER_VALIDATION)
+        response = await client.post("/validate-token", headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 200:
+            user_info = response.json()
+            user_id = user_info.get("user_id")
+            if user_id is not None:
+                token_cache.set(key, user_id)
+            return user_id
+        raise ResponseException(status_code=response.status_code,
+                                message=response.json().get("detail", "Access Denied"))
+
+    @staticmethod
+    def evict_token(token):
+        token_cache.delete(token_cache_key(token))
+        if jwt_verifier is not None:
+            jwt_verifier.revoke(token)
+
     @staticmethod
     def validate_token(func):
         async def validate(self, token, *args, **kwargs):
             try:
-                async with httpx.AsyncClient() as client:
-                    user_validation_service_url = os.getenv("USER_VALIDATION_SERVICE_URL", "http://localhost:8001")
-                    response = await client.post(f"{user_validation_service_url}/validate-token",
-                                                 headers={"Authorization": f"Bearer {token}"})
-                    if response.status_code == 200:
-                        user_info = response.json()
-                        user_id = user_info.get("user_id")
-                        return await func(self, user_id, *args, **kwargs)
-                    else:
-                        raise ResponseException(status_code=response.status_code,
-                                                message=response.json().get("detail", "Access Denied"))
+                user_id = await self.resolve_user_id(token)
+                return await func(self, user_id, *args, **kwargs)
+            except ResponseException:
+                raise
             except Exception as e:
                 raise ResponseException(status_code=500,message=f"Service Error : {e}")
-        return validate
\ No newline at end of file
+        return validate
+
+    @staticmethod
+    def validate_token_alongside(check, optimistic_read=None):
+        # check(self, *args) raises when the request is invalid and does not need the user id,
+        # so it can run concurrently with the token validation; keyword arguments only go to func.
+        # In optimistic mode optimistic_read(self, *args) is issued together with both
+        # validations and its result is only returned once they have passed.
+        def decorator(func):
+            async def validate(self, token, *args, **kwargs):
+                try:
+                    if fan_out_mode == SEQUENTIAL:
+                        user_id = await self.resolve_user_id(token)
+                        await check(self, *args)
+                    elif fan_out_mode == OPTIMISTIC and optimistic_read is not None:
+                        _, _, result = await gather_or_cancel(self.resolve_user_id(token),
+                                                              check(self, *args),
+                                                              optimistic_read(self, *args))
+                        return result
+                    else:
+                        user_id, _ = await gather_or_cancel(self.resolve_user_id(token),
+                                                            check(self, *args))
+                    return await func(self, user_id, *args, **kwargs)
+                except ResponseException:
+                    raise
+                except Exception as e:
+                    raise ResponseException(status_code=500,message=f"Service Error : {e}")
+            return validate
+        return decorator
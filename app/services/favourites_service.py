@@ -1,49 +1,62 @@
-import os
-import httpx
-
 from app.models.favourite import FavouriteResponse, FavouriteRequest, FavouritesResponse
 from app.services.base_validation_service import BaseValidationService
+from app.services.page_prefetcher import page_prefetcher as default_page_prefetcher
+from app.services.recommendations_cache import recommendations_cache as default_recommendations_cache
+from app.utils.http_clients import CATALOGUE
 from framework.exceptions.response_exceptions import ResponseException
 
 
 class FavouritesService(BaseValidationService):
 
-    def __init__(self):
-        self.MATCH_SERVICE_URL = os.getenv("MATCH_SERVICE_URL", "http://localhost:8002")
+    def __init__(self, http_clients=None, game_catalogue=None, recommendations_cache=None, page_prefetcher=None):
+        super().__init__(http_clients, game_catalogue)
+        self.recommendations_cache = recommendations_cache or default_recommendations_cache
+        self.page_prefetcher = page_prefetcher or default_page_prefetcher
 
-    @BaseValidationService.validate_token
-    async def add_favourite(self, user_id, favourite_request:FavouriteRequest) -> FavouriteResponse:
-        favourite_request_data = favourite_request.dict()
-        game_id = favourite_request_data["gameId"]
-        is_valid_game = await self.validate_game(game_id)
+    @property
+    def match_client(self):
+        return self.http_clients.get(CATALOGUE)
+
+    async def _check_game(self, favourite_request: FavouriteRequest):
+        is_valid_game = await self.validate_game(favourite_request.gameId)
         if not is_valid_game:
             raise ResponseException(status_code=404, message="Game not found")
 
+    @BaseValidationService.validate_token_alongside(_check_game)
+    async def add_favourite(self, user_id, favourite_request:FavouriteRequest) -> FavouriteResponse:
+        favourite_request_data = favourite_request.dict()
         favourite_request_data["userId"] = user_id
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.MATCH_SERVICE_URL}/favourite", json=favourite_request_data)
-            if response.status_code == 201:
-                fav_response = FavouriteResponse(**response.json())
-                return fav_response
-            raise ResponseException(status_code=response.status_code, message="Error adding favourite game")
+        response = await self.match_client.post("/favourite", json=favourite_request_data)
+        if response.status_code == 201:
+            fav_response = FavouriteResponse(**response.json())
+            self.recommendations_cache.refresh(user_id)
+            self.page_prefetcher.invalidate(user_id)
+            return fav_response
+        raise ResponseException(status_code=response.status_code, message="Error adding favourite game")
 
     @BaseValidationService.validate_token
     async def get_favourites(self, user_id, page, page_size) -> FavouritesResponse:
+        return await self.get_user_favourites(user_id, page, page_size)
+
+    async def get_user_favourites(self, user_id, page, page_size) -> FavouritesResponse:
+        # for callers that have already validated the token, such as /home
+        return await self.page_prefetcher.get_page(
+            ("favourites", page_size), page,
+            lambda page_number: self._fetch_favourites(user_id, page_number, page_size),
+            # favourites carry no pagination links, so a full page is taken to mean there is another
+            lambda favourites: len(favourites.games) >= page_size, self.match_client, scope=user_id)
+
+    async def _fetch_favourites(self, user_id, page, page_size) -> FavouritesResponse:
         params = {
             "page": page,
             "page_size": page_size,
             "user_id": user_id
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.MATCH_SERVICE_URL}/favourites/{user_id}", params=params)
-            if response.status_code == 200:
-                favs_response = FavouritesResponse(**response.json())
-                return favs_response
-            raise ResponseException(status_code=response.status_code, message="Error adding favourite game")
-
-    async def validate_game(self, game_id):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/games/{game_id}")
-            if response.status_code == 200:
-                return True
-            return False
+        # read-only despite the POST, so it may be retried
+        response = await self.match_client.post(f"/favourites/{user_id}", params=params, idempotent=True)
+        if response.status_code == 200:
+            favs_data = response.json()
+            games = await self.game_catalogue.hydrate(favs_data.get("games", []))
+            favs_response = FavouritesResponse(**dict(favs_data, games=games))
+            return favs_response
+        raise ResponseException(status_code=response.status_code, message="Error adding favourite game")
@@ -0,0 +1,93 @@
+from typing import Optional, Dict, List
+
+from pydantic import ValidationError
+
+from app.models.game import GameResponse
+from app.settings import settings
+from app.utils.caches import build_cache
+from app.utils.http_clients import http_clients as default_http_clients, CATALOGUE
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.json_codec import JsonCodec
+from framework.cache.ttl_cache import TTLCache
+from framework.exceptions.response_exceptions import ResponseException
+from framework.utils.fan_out import bounded_gather
+from framework.utils.single_flight import SingleFlight
+
+class _NotFound:
+    pass
+
+
+# cached in place of a GameResponse for ids the match service answered 404 for
+NOT_FOUND = _NotFound()
+
+# decodes to the same NOT_FOUND instance, so `is NOT_FOUND` holds for entries from a shared cache
+GAME_CODEC = JsonCodec(models=[GameResponse], types={_NotFound: (lambda value: None, lambda data: NOT_FOUND)})
+
+
+class GameCatalogue:
+
+    def __init__(self, http_clients=None, max_size=5000, ttl=600.0, not_found_ttl=30.0, lookup_concurrency=10,
+                 cache: CacheBackend = None):
+        self.http_clients = http_clients or default_http_clients
+        self.cache = cache if cache is not None else TTLCache(max_size=max_size, ttl=ttl)
+        self.not_found_ttl = not_found_ttl
+        self.lookup_concurrency = lookup_concurrency
+        self._fetches = SingleFlight()
+
+    async def get_game(self, game_id) -> Optional[GameResponse]:
+        cached = self.cache.get(game_id)
+        if cached is not None:
+            return None if cached is NOT_FOUND else cached
+        return await self._fetches.do(game_id, lambda: self._fetch_game(game_id))
+
+    async def exists(self, game_id) -> bool:
+        return await self.get_game(game_id) is not None
+
+    async def get_games(self, game_ids) -> Dict[str, GameResponse]:
+        # Cached ids cost nothing; the misses are fetched concurrently, lookup_concurrency at a time
+        unique_ids = list(dict.fromkeys(game_ids))
+        results = await bounded_gather([self.get_game(game_id) for game_id in unique_ids], self.lookup_concurrency)
+        return {game_id: game for game_id, game in zip(unique_ids, results) if isinstance(game, GameResponse)}
+
+    async def hydrate(self, raw_games) -> List[GameResponse]:
+        # Upstreams may embed full game documents, partial ones or bare ids; returns full
+        # GameResponses in the same order and drops ids that no longer resolve to a game
+        games = []
+        for raw_game in raw_games:
+            if isinstance(raw_game, dict):
+                try:
+                    game = GameResponse(**raw_game)
+                    self.put(game)
+                    games.append(game)
+                    continue
+                except ValidationError:
+                    raw_game = raw_game.get("gameId")
+            if isinstance(raw_game, str):
+                games.append(raw_game)
+
+        missing = [game for game in games if isinstance(game, str)]
+        if not missing:
+            return games
+        found = await self.get_games(missing)
+        return [found[game] if isinstance(game, str) else game
+                for game in games if not isinstance(game, str) or game in found]
+
+    def put(self, game: GameResponse):
+        self.cache.set(game.gameId, game)
+
+    async def _fetch_game(self, game_id):
+        response = await self.http_clients.get(CATALOGUE).get(f"/games/{game_id}")
+        if response.status_code == 200:
+            game = GameResponse(**response.json())
+            self.cache.set(game_id, game)
+            return game
+        if response.status_code == 404:
+            self.cache.set(game_id, NOT_FOUND, ttl=self.not_found_ttl)
+            return None
+        raise ResponseException(status_code=response.status_code, message="Error fetching game")
+
+
+game_catalogue = GameCatalogue(not_found_ttl=settings.cache.game_not_found_ttl,
+                               lookup_concurrency=settings.cache.game_lookup_concurrency,
+                               cache=build_cache("games", max_size=settings.cache.game_max_size,
+                                                 ttl=settings.cache.game_ttl, codec=GAME_CODEC))
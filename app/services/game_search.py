@@ -0,0 +1,173 @@
+import json
+import time
+import asyncio
+import logging
+from typing import List, Optional
+from urllib.parse import urlencode
+
+from pydantic import ValidationError
+
+from app.models.game import GameResponse
+from app.settings import settings
+from app.utils.http_clients import http_clients as default_http_clients, CATALOGUE
+from framework.exceptions.response_exceptions import ResponseException
+from framework.search.text_index import NO_DOCUMENTS, Filter, NgramIndex, TermIndex, find
+
+logger = logging.getLogger(__name__)
+
+
+def _page_links(page, page_size, has_next, filters):
+    def link(page_number):
+        query = urlencode(dict({"page": page_number, "page_size": page_size}, **filters))
+        return {"href": f"/games?{query}"}
+
+    return {"self": link(page),
+            "next": link(page + 1) if has_next else None,
+            "prev": link(page - 1) if page > 1 else None}
+
+
+class GameSnapshot:
+    # One catalogue snapshot and its indexes. It is never changed once built: a refresh builds
+    # a new snapshot and swaps it in, so a search sees either the old catalogue or the new one.
+    # Games keep the match service's order and are stored already encoded.
+
+    def __init__(self, games: List[GameResponse], loaded_at):
+        self.loaded_at = loaded_at
+        self._bodies = [game.json().encode() for game in games]
+        self._positions = {}
+        self._titles = NgramIndex()
+        self._genres = TermIndex()
+        for position, game in enumerate(games):
+            self._positions.setdefault(game.gameId, position)
+            self._titles.add(position, game.title)
+            self._genres.add(position, game.genre)
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def search(self, title=None, game_id=None, genre=None, start=0, limit=10):
+        # positions of one page of matches, and whether more follow
+        filters = []
+        if game_id is not None:
+            position = self._positions.get(game_id)
+            candidates = NO_DOCUMENTS if position is None else (position,)
+            filters.append(Filter(candidates, lambda other: other == position, exact=True))
+        if genre is not None:
+            filters.append(self._genres.search(genre))
+        if title is not None:
+            filters.append(self._titles.search(title))
+        return find(filters, len(self._bodies), start, limit)
+
+    def page(self, page, page_size, title=None, game_id=None, genre=None) -> bytes:
+        # the GamesResponse body for one page of the results
+        positions, has_next = self.search(title, game_id, genre, (page - 1) * page_size, page_size)
+        games = b",".join(self._bodies[position] for position in positions)
+        filters = {name: value for name, value in (("title", title), ("game_id", game_id), ("genre", genre))
+                   if value is not None}
+        links = json.dumps(_page_links(page, page_size, has_next, filters), separators=(",", ":"))
+        return b'{"games":[' + games + b'],"links":' + links.encode() + b"}"
+
+
+class GameSearch:
+    # Answers GET /games from an in-memory snapshot of the catalogue, reloaded every
+    # refresh_interval seconds. Until the first load succeeds (or when disabled) page()
+    # returns None and the caller asks the match service instead.
+
+    def __init__(self, http_clients=None, enabled=True, refresh_interval=300.0, retry_interval=30.0,
+                 page_size=500, max_games=100000):
+        self.http_clients = http_clients or default_http_clients
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.page_size = page_size
+        self.max_games = max_games
+        self.snapshot: Optional[GameSnapshot] = None
+        self._task = None
+        self.refreshes = 0
+        self.failures = 0
+        self.local = 0
+        self.fallbacks = 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def page(self, page, page_size, title=None, game_id=None, genre=None) -> Optional[bytes]:
+        snapshot = self.snapshot
+        if snapshot is None or page < 1 or page_size < 1:
+            self.fallbacks += 1
+            return None
+        self.local += 1
+        return snapshot.page(page, page_size, title, game_id, genre)
+
+    async def refresh(self):
+        raw_games = await self._fetch_catalogue()
+        if raw_games is None:
+            logger.warning("The game catalogue has more than %s games, searching it upstream", self.max_games)
+            self.snapshot = None
+            return
+        # validating and indexing a large catalogue takes a while, so it is kept off the event loop
+        snapshot = await asyncio.to_thread(self._build_snapshot, raw_games, time.time())
+        self.snapshot = snapshot
+        self.refreshes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                delay = self.refresh_interval
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Refreshing the game search index failed: %s", e)
+                delay = min(self.retry_interval, self.refresh_interval)
+            await asyncio.sleep(delay)
+
+    async def _fetch_catalogue(self):
+        # follows the next links, so an upstream that caps page_size is still read in full
+        client = self.http_clients.get(CATALOGUE)
+        url, params = "/games", {"page": 1, "page_size": self.page_size}
+        raw_games, seen = [], {url}
+        while url is not None:
+            response = await client.get(url, params=params)
+            if response.status_code != 200:
+                raise ResponseException(status_code=response.status_code, message="Error fetching the game catalogue")
+            page = response.json()
+            raw_games.extend(page.get("games", []))
+            if len(raw_games) > self.max_games:
+                return None
+            next_link = (page.get("links") or {}).get("next")
+            url, params = (next_link or {}).get("href"), None
+            if url in seen:
+                break
+            seen.add(url)
+        return raw_games
+
+    @staticmethod
+    def _build_snapshot(raw_games, loaded_at):
+        games = []
+        for raw_game in raw_games:
+            try:
+                games.append(GameResponse(**raw_game))
+            except (TypeError, ValidationError) as e:
+                logger.warning("Leaving an invalid game out of the search index: %s", e)
+        return GameSnapshot(games, loaded_at)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {"size": len(snapshot) if snapshot is not None else 0,
+                "age": time.time() - snapshot.loaded_at if snapshot is not None else None,
+                "refreshes": self.refreshes, "failures": self.failures,
+                "local": self.local, "fallbacks": self.fallbacks}
+
+
+# started and stopped by the app lifespan
+game_search = GameSearch(enabled=settings.search.game_index_enabled,
+                         refresh_interval=settings.search.game_index_refresh_seconds,
+                         page_size=settings.search.game_index_page_size,
+                         max_games=settings.search.game_index_max_games)
@@ -1,35 +1,95 @@
-import os
-import httpx
-from app.models.game import GameResponse, GamesResponse
+import time
+
+from app.models.game import GamesResponse
+from app.settings import settings
 from app.services.base_validation_service import BaseValidationService
+from app.services.page_prefetcher import page_prefetcher as default_page_prefetcher, has_next_page
+from app.services.game_search import game_search as default_game_search
+from app.utils.caches import build_cache
+from app.utils.http_clients import CATALOGUE
+from app.utils.passthrough import passthrough
+from framework.cache.response_cache import ResponseCache, CachedResponse, CACHED_RESPONSE_CODEC
 from framework.exceptions.response_exceptions import ResponseException
 
+# serialized /games pages and game documents, shared by every request
+RESPONSE_CACHE_TTL = settings.cache.response_ttl
+RESPONSE_CACHE_STALE_TTL = settings.cache.response_stale_ttl
+games_response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL, stale_ttl=RESPONSE_CACHE_STALE_TTL, clock=time.time,
+                                     entries=build_cache("responses",
+                                                         max_size=settings.cache.response_max_size,
+                                                         ttl=RESPONSE_CACHE_TTL + RESPONSE_CACHE_STALE_TTL,
+                                                         clock=time.time, codec=CACHED_RESPONSE_CODEC))
+games_passthrough = passthrough(GamesResponse)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        value = value.strip()
+    return value if value not in ("", None) else None
+
 
 class GamesService(BaseValidationService):
 
-    def __init__(self):
-        self.MATCH_SERVICE_URL = os.getenv("MATCH_SERVICE_URL", "http://localhost:8002")
+    def __init__(self, http_clients=None, game_catalogue=None, response_cache=None, game_search=None,
+                 page_prefetcher=None):
+        super().__init__(http_clients, game_catalogue)
+        self.response_cache = response_cache or games_response_cache
+        self.game_search = game_search or default_game_search
+        self.page_prefetcher = page_prefetcher or default_page_prefetcher
+
+    @property
+    def match_client(self):
+        return self.http_clients.get(CATALOGUE)
 
     # @BaseValidationService.validate_token
     async def get_game(self, user_id, game_id):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/games/{game_id}")
-            if response.status_code == 200:
-                game_response = GameResponse(**response.json())
-                return game_response
-            raise ResponseException(status_code=response.status_code, message="Error fetching game")
+        game_response = await self.game_catalogue.get_game(game_id)
+        if game_response is None:
+            raise ResponseException(status_code=404, message="Error fetching game")
+        return game_response
 
     # @BaseValidationService.validate_token
     async def get_games(self, user_id, page, page_size, title, game_id, genre):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.MATCH_SERVICE_URL}/games",
-                params={"page": page, "page_size": page_size, "title": title, "game_id": game_id, "genre": genre},
-            )
-            if response.status_code == 200:
-                games_response = GamesResponse(**response.json())
-                return games_response
-            raise ResponseException(status_code=response.status_code, message="Error fetching games")
+        response = await self._fetch_games(page, page_size, title, game_id, genre)
+        games_response = GamesResponse(**response.json())
+        return games_response
+
+    async def _fetch_games(self, page, page_size, title, game_id, genre):
+        response = await self.match_client.get(
+            "/games",
+            params={"page": page, "page_size": page_size, "title": title, "game_id": game_id, "genre": genre},
+        )
+        if response.status_code == 200:
+            return response
+        raise ResponseException(status_code=response.status_code, message="Error fetching games")
+
+    async def get_game_cached(self, user_id, game_id) -> CachedResponse:
+        async def load():
+            game_response = await self.get_game(user_id, game_id)
+            return game_response.json().encode()
+
+        return await self.response_cache.get_or_load(("game", game_id), load)
+
+    async def get_games_cached(self, user_id, page, page_size, title, game_id, genre) -> CachedResponse:
+        title, game_id, genre = _normalize(title), _normalize(game_id), _normalize(genre)
+        # answered from the in-memory index once it is loaded, the match service meanwhile
+        body = self.game_search.page(page, page_size, title, game_id, genre)
+        if body is not None:
+            return CachedResponse(body, time.time())
+
+        async def fetch(page_number):
+            if games_passthrough.enabled:
+                response = await self._fetch_games(page_number, page_size, title, game_id, genre)
+                return games_passthrough.body(response.content)
+            games_response = await self.get_games(user_id, page_number, page_size, title, game_id, genre)
+            return games_response.json().encode()
+
+        async def load():
+            # the catalogue is the same for every user, so the prefetched pages are shared
+            return await self.page_prefetcher.get_page(("games", page_size, title, game_id, genre), page, fetch,
+                                                       has_next_page, self.match_client)
+
+        return await self.response_cache.get_or_load(("games", page, page_size, title, game_id, genre), load)
 
 
 
@@ -0,0 +1,91 @@
+import json
+import asyncio
+import logging
+
+from app.models.home import HomeResponse, DegradedSection
+from app.models.match import MatchResponses
+from app.settings import settings
+from app.services.base_validation_service import BaseValidationService
+from app.services.favourites_service import FavouritesService
+from app.services.match_service import MatchService
+from app.services.recom_service import RecomService
+from app.utils.metrics import metrics
+from framework.exceptions.response_exceptions import ResponseException
+from framework.resilience import deadline
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS = "recommendations"
+FAVOURITES = "favourites"
+MATCH_REQUESTS = "matchRequests"
+
+SECTION_TIMEOUTS = {
+    RECOMMENDATIONS: settings.home.recommendations_timeout,
+    FAVOURITES: settings.home.favourites_timeout,
+    MATCH_REQUESTS: settings.home.match_requests_timeout,
+}
+
+degraded_sections = metrics.counter("iris_home_degraded_sections_total",
+                                    "Sections left out of a /home response", ("section", "reason"))
+
+
+class HomeService(BaseValidationService):
+    # Composes the home screen from the recommendations, favourites and match request services.
+    # The token is validated once and the sections are loaded concurrently, each within its own
+    # timeout; a section that fails or runs late is left out and listed as degraded.
+
+    def __init__(self, http_clients=None, game_catalogue=None, recom_service=None, favourites_service=None,
+                 match_service=None, section_timeouts=None):
+        super().__init__(http_clients, game_catalogue)
+        self.recom_service = recom_service or RecomService(http_clients, game_catalogue)
+        self.favourites_service = favourites_service or FavouritesService(http_clients, game_catalogue)
+        self.match_service = match_service or MatchService(http_clients, game_catalogue)
+        self.section_timeouts = section_timeouts or SECTION_TIMEOUTS
+
+    @BaseValidationService.validate_token
+    async def get_home(self, user_id, num_recoms, page_size) -> HomeResponse:
+        (recommendations, favourites, match_requests), degraded = await self._load_sections({
+            RECOMMENDATIONS: self.recom_service.get_user_recommendations(user_id, num_recoms),
+            FAVOURITES: self.favourites_service.get_user_favourites(user_id, 1, page_size),
+            MATCH_REQUESTS: self.match_service.get_user_match_requests(user_id, 1, page_size, None),
+        })
+
+        games = {}
+
+        def game_ids(section_games):
+            for game in section_games:
+                games.setdefault(game.gameId, game)
+            return [game.gameId for game in section_games]
+
+        if isinstance(match_requests, bytes):
+            # a pass-through body from the match service
+            match_requests = MatchResponses(**json.loads(match_requests))
+        return HomeResponse(userId=user_id,
+                            games=games,
+                            recommendations=game_ids(recommendations.games) if recommendations else None,
+                            favourites=game_ids(favourites.games) if favourites else None,
+                            matchRequests=match_requests,
+                            degraded=degraded)
+
+    async def _load_sections(self, calls):
+        results = await asyncio.gather(*(self._load_section(name, call) for name, call in calls.items()))
+        values = [value for value, _ in results]
+        degraded = [section for _, section in results if section is not None]
+        for section in degraded:
+            degraded_sections.inc(section.section, section.reason)
+        return values, degraded
+
+    async def _load_section(self, name, call):
+        timeout = self.section_timeouts[name]
+        remaining = deadline.remaining()
+        if remaining is not None:
+            timeout = max(0.0, min(timeout, remaining))
+        try:
+            return await asyncio.wait_for(call, timeout), None
+        except asyncio.TimeoutError:
+            return None, DegradedSection(section=name, reason="timeout")
+        except ResponseException as e:
+            return None, DegradedSection(section=name, reason="error", statusCode=e.status_code, detail=e.message)
+        except Exception as e:
+            logger.warning("Loading the %s section of /home failed: %s", name, e)
+            return None, DegradedSection(section=name, reason="error", statusCode=500, detail="Service Error")
@@ -1,28 +1,62 @@
-import os
-import httpx
 from app.models.match import MatchResponses, MatchRequest, MatchResponse, MatchInitiate, MatchStatus
 from app.models.match import MatchResponseWithLinks, MatchInitiateResponse
+from app.models.match import MatchRequestBatchItem, MatchRequestBatchResponse
+from app.models.match import MatchStatusBatchItem, MatchStatusBatchResponse
+from app.settings import settings
 from app.services.base_validation_service import BaseValidationService
+from app.services.page_prefetcher import page_prefetcher as default_page_prefetcher, has_next_page
+from app.services.match_status_broadcaster import match_status_broadcaster as default_status_broadcaster
+from app.utils.http_clients import MATCH
+from app.utils.passthrough import passthrough
 from framework.exceptions.response_exceptions import ResponseException
+from framework.utils.fan_out import gather_or_cancel, bounded_gather
+from framework.resilience import deadline
+
+BATCH_CONCURRENCY = settings.match.batch_concurrency
+MAX_BATCH_ITEMS = settings.match.batch_max_items
+
+match_request_passthrough = passthrough(MatchResponseWithLinks)
+match_requests_passthrough = passthrough(MatchResponses)
 
 
 class MatchService(BaseValidationService):
 
-    def __init__(self):
-        self.MATCH_SERVICE_URL = os.getenv("MATCH_SERVICE_URL", "http://localhost:8003")
+    def __init__(self, http_clients=None, game_catalogue=None, status_broadcaster=None, page_prefetcher=None):
+        super().__init__(http_clients, game_catalogue)
+        self.status_broadcaster = status_broadcaster or default_status_broadcaster
+        self.page_prefetcher = page_prefetcher or default_page_prefetcher
+
+    @property
+    def match_client(self):
+        # looked up per call, so a long-lived service follows the clients across lifespans
+        return self.http_clients.get(MATCH)
 
     @BaseValidationService.validate_token
     async def get_match_request(self, user_id, match_id):
-        async with httpx.AsyncClient() as client:
-            match_response = await client.get(f"{self.MATCH_SERVICE_URL}/match-requests/{match_id}")
-            if match_response.status_code == 200:
-                match_responses_model = MatchResponseWithLinks(**match_response.json())
-                return match_responses_model
-            raise ResponseException(status_code=match_response.status_code, message="Error fetching match request")
+        match_response = await self.match_client.get(f"/match-requests/{match_id}")
+        if match_response.status_code == 200:
+            if match_request_passthrough.enabled:
+                return match_request_passthrough.body(match_response.content)
+            match_responses_model = MatchResponseWithLinks(**match_response.json())
+            return match_responses_model
+        raise ResponseException(status_code=match_response.status_code, message="Error fetching match request")
 
     @BaseValidationService.validate_token
     async def get_match_requests(self, user_id, page, page_size, game_id):
-
+        if match_requests_passthrough.streamed:
+            # neither prefetched nor held in memory: the router forwards the body as it arrives
+            return await self._stream_match_requests(user_id, page, page_size, game_id)
+        return await self.get_user_match_requests(user_id, page, page_size, game_id)
+
+    async def get_user_match_requests(self, user_id, page, page_size, game_id):
+        # for callers that have already validated the token, such as /home
+        return await self.page_prefetcher.get_page(
+            ("match_requests", page_size, game_id), page,
+            lambda page_number: self._fetch_match_requests(user_id, page_number, page_size, game_id),
+            has_next_page, self.match_client, scope=user_id)
+
+    @staticmethod
+    def _match_requests_params(user_id, page, page_size, game_id):
         params = {
             "page": page,
             "page_size": page_size,
@@ -30,82 +64,162 @@ class MatchService(BaseValidationService):
         }
         if game_id is not None:
             params["game_id"] = game_id
+        return params
+
+    async def _stream_match_requests(self, user_id, page, page_size, game_id):
+        params = self._match_requests_params(user_id, page, page_size, game_id)
+        match_response = await self.match_client.stream("GET", "/match-requests", params=params)
+        if match_response.status_code == 200:
+            return match_response
+        await match_response.aclose()
+        raise ResponseException(status_code=match_response.status_code, message="Error fetching match requests")
+
+    async def _fetch_match_requests(self, user_id, page, page_size, game_id):
+        params = self._match_requests_params(user_id, page, page_size, game_id)
+        match_response = await self.match_client.get("/match-requests", params=params)
+        if match_response.status_code == 200:
+            if match_requests_passthrough.enabled:
+                return match_requests_passthrough.body(match_response.content)
+            match_responses_model = MatchResponses(**match_response.json())
+            return match_responses_model
+        raise ResponseException(status_code=match_response.status_code, message="Error fetching match requests")
+
+    async def _check_game(self, match_request: MatchRequest):
+        is_game = await self.validate_game(match_request.gameId)
+        if not is_game:
+            raise ResponseException(status_code=404, message="Game not found")
 
-        async with httpx.AsyncClient() as client:
-            match_response = await client.get(f"{self.MATCH_SERVICE_URL}/match-requests", params=params)
-            if match_response.status_code == 200:
-                match_responses_model = MatchResponses(**match_response.json())
-                return match_responses_model
-            raise ResponseException(status_code=match_response.status_code, message="Error fetching match requests")
+    async def _check_match_request(self, match_id):
+        is_valid_match = await self.validate_match_request(match_id)
+        if not is_valid_match:
+            raise ResponseException(status_code=404, message="Match not found or not valid")
 
-    @BaseValidationService.validate_token
+    async def _check_match_initiate(self, match_initiate: MatchInitiate):
+        await self._check_match_request(match_initiate.MatchRequestId)
+
+    async def _fetch_match_status(self, match_id):
+        response = await self.match_client.get(f"/match/status/{match_id}")
+
+        if response.status_code == 200:
+            match_status_model = MatchStatus(**response.json())
+            return match_status_model
+
+        raise ResponseException(status_code=response.status_code, message="Error finding match status")
+
+    async def _prefetch_games(self, match_requests):
+        # warms the game catalogue for a batch; per-item failures are reported by create_match_requests
+        if len(match_requests) > MAX_BATCH_ITEMS:
+            # rejected by create_match_requests, once the token has been validated
+            return
+        game_ids = {match_request.gameId for match_request in match_requests}
+        await bounded_gather([self.validate_game(game_id) for game_id in game_ids], BATCH_CONCURRENCY)
+
+    @BaseValidationService.validate_token_alongside(_check_game)
     async def create_match_request(self, user_id, match_request : MatchRequest):
+        return await self._create_match_request(user_id, match_request)
 
+    async def _create_match_request(self, user_id, match_request: MatchRequest):
         match_request_data = match_request.dict()
         match_request_data["userId"] = user_id
 
-        game_id = match_request_data["gameId"]
-
-        is_game = await self.validate_game(game_id)
-        if not is_game:
-            raise ResponseException(status_code=404, message="Game not found")
-
-        async with httpx.AsyncClient() as client:
-            match_response = await client.post(f"{self.MATCH_SERVICE_URL}/match-requests", json=match_request_data)
+        match_response = await self.match_client.post("/match-requests", json=match_request_data)
 
-            if match_response.status_code == 201:
-                match_response_model = MatchResponse(**match_response.json())
-                return match_response_model
+        if match_response.status_code == 201:
+            match_response_model = MatchResponse(**match_response.json())
+            self.page_prefetcher.invalidate(user_id)
+            return match_response_model
 
-            raise ResponseException(status_code=match_response.status_code,
+        raise ResponseException(status_code=match_response.status_code,
                                 message="Error creating match request in the Match service")
 
-    @BaseValidationService.validate_token
+    @BaseValidationService.validate_token_alongside(_check_match_initiate)
     async def initiate_match(self, user_id, match_initiate: MatchInitiate):
         match_initiate_data = match_initiate.dict()
-        match_id = match_initiate_data["MatchRequestId"]
-        is_valid_match = await self.validate_match_request(match_id)
 
-        if not is_valid_match:
-            raise ResponseException(status_code=404, message="Match not found or not valid")
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.MATCH_SERVICE_URL}/match-requests/match", json=match_initiate_data)
+        response = await self.match_client.post("/match-requests/match", json=match_initiate_data)
 
-            if response.status_code == 202:
-                response_model = MatchInitiateResponse(**response.json())
-                return response_model
+        if response.status_code == 202:
+            response_model = MatchInitiateResponse(**response.json())
+            self.page_prefetcher.invalidate(user_id)
+            return response_model
 
-            raise ResponseException(status_code=response.status_code, message="Error initiating matching process")
+        raise ResponseException(status_code=response.status_code, message="Error initiating matching process")
 
-    @BaseValidationService.validate_token
+    @BaseValidationService.validate_token_alongside(_check_match_request, optimistic_read=_fetch_match_status)
     async def get_match_status(self, user_id, match_id):
+        return await self._fetch_match_status(match_id)
+
+    @BaseValidationService.validate_token_alongside(_check_match_request)
+    async def wait_for_match_status(self, user_id, match_id, last_status=None, wait=None):
+        # the wait does not count against the request deadline, the fetch after it does
+        extended = deadline.extend_deadline(wait or 0.0)
+        try:
+            match_status_model = await self.status_broadcaster.wait_for_change(match_id, last_status, wait)
+            if match_status_model is None:
+                match_status_model = await self._fetch_match_status(match_id)
+        finally:
+            deadline.reset_deadline(extended)
+        return match_status_model
+
+    @BaseValidationService.validate_token_alongside(_check_match_request)
+    async def watch_match_status(self, user_id, match_id, heartbeat=None):
+        return self.status_broadcaster.watch(match_id, heartbeat=heartbeat)
+
+    @BaseValidationService.validate_token_alongside(_prefetch_games)
+    async def create_match_requests(self, user_id, match_requests):
+        if len(match_requests) > MAX_BATCH_ITEMS:
+            raise ResponseException(status_code=422,
+                                    message=f"A batch may contain at most {MAX_BATCH_ITEMS} match requests")
+
+        async def create(match_request):
+            await self._check_game(match_request)
+            return await self._create_match_request(user_id, match_request)
+
+        results = await bounded_gather([create(match_request) for match_request in match_requests],
+                                       BATCH_CONCURRENCY)
+        items = []
+        for index, result in enumerate(results):
+            if isinstance(result, MatchResponse):
+                items.append(MatchRequestBatchItem(index=index, statusCode=201, matchRequest=result))
+            else:
+                status_code, detail = self._batch_error(result)
+                items.append(MatchRequestBatchItem(index=index, statusCode=status_code, detail=detail))
+        return MatchRequestBatchResponse(results=items)
 
-        is_valid_match = await self.validate_match_request(match_id)
-        if not is_valid_match:
-            raise ResponseException(status_code=404, message="Match not found or not valid")
-
-        async with httpx.AsyncClient() as client:
-            print("Getting match status")
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/match/status/{match_id}")
-
-            if response.status_code == 200:
-                match_status_model = MatchStatus(**response.json())
-                return match_status_model
-
-            raise ResponseException(status_code=response.status_code, message="Error finding match status")
-
-
-    async def validate_game(self, game_id):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/games/{game_id}")
-            if response.status_code == 200:
-                return True
-            return False
+    @BaseValidationService.validate_token
+    async def get_match_statuses(self, user_id, match_ids):
+        if len(match_ids) > MAX_BATCH_ITEMS:
+            raise ResponseException(status_code=422,
+                                    message=f"A batch may contain at most {MAX_BATCH_ITEMS} match request ids")
+        unique_ids = list(dict.fromkeys(match_ids))
+
+        async def fetch(match_id):
+            _, match_status_model = await gather_or_cancel(self._check_match_request(match_id),
+                                                           self._fetch_match_status(match_id))
+            return match_status_model
+
+        results = dict(zip(unique_ids, await bounded_gather([fetch(match_id) for match_id in unique_ids],
+                                                            BATCH_CONCURRENCY)))
+        items = []
+        for match_id in match_ids:
+            result = results[match_id]
+            if isinstance(result, MatchStatus):
+                items.append(MatchStatusBatchItem(matchRequestId=match_id, statusCode=200, matchStatus=result))
+            else:
+                status_code, detail = self._batch_error(result)
+                items.append(MatchStatusBatchItem(matchRequestId=match_id, statusCode=status_code, detail=detail))
+        return MatchStatusBatchResponse(results=items)
+
+    @staticmethod
+    def _batch_error(error):
+        if isinstance(error, ResponseException):
+            return error.status_code, error.message
+        return 502, f"Service Error : {error}"
 
     async def validate_match_request(self, match_request_id):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/match-requests/{match_request_id}")
-            if response.status_code == 200:
-                return True
-            return False
\ No newline at end of file
+        response = await self.match_client.get(f"/match-requests/{match_request_id}")
+        if response.status_code == 200:
+            return True
+        if response.status_code >= 500:
+            raise ResponseException(status_code=502, message="Error validating match request")
+        return False
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+
+import httpx
+
+from app.models.match import MatchStatus
+from app.settings import settings
+from app.utils.http_clients import http_clients as default_http_clients, MATCH
+from framework.exceptions.response_exceptions import ResponseException
+from framework.resilience import deadline
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"matched", "not_found", "error"}
+
+
+class _MatchWatcher:
+
+    def __init__(self, match_id):
+        self.match_id = match_id
+        self.subscribers = set()
+        self.last_status = None
+        self.task = None
+
+
+class MatchStatusBroadcaster:
+    # Polls the match service once per interval for each watched match request,
+    # however many clients are subscribed, and pushes status transitions to all of them
+
+    def __init__(self, http_clients=None, poll_interval=2.0):
+        self.http_clients = http_clients or default_http_clients
+        self.poll_interval = poll_interval
+        self._watchers = {}
+
+    def watcher_count(self):
+        return len(self._watchers)
+
+    async def watch(self, match_id, heartbeat=None):
+        # Yields each new MatchStatus until a terminal one, or None every `heartbeat` seconds of silence
+        watcher = self._watchers.get(match_id)
+        if watcher is None:
+            watcher = _MatchWatcher(match_id)
+            self._watchers[match_id] = watcher
+            watcher.task = asyncio.create_task(self._poll(watcher))
+
+        queue = asyncio.Queue()
+        watcher.subscribers.add(queue)
+        if watcher.last_status is not None:
+            queue.put_nowait(watcher.last_status)
+        try:
+            while True:
+                try:
+                    status = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield status
+                if status.status in TERMINAL_STATUSES:
+                    return
+        finally:
+            watcher.subscribers.discard(queue)
+            if not watcher.subscribers and self._watchers.get(match_id) is watcher:
+                del self._watchers[match_id]
+                watcher.task.cancel()
+
+    async def wait_for_change(self, match_id, last_status, timeout):
+        # Returns the first MatchStatus whose status differs from last_status,
+        # or the latest one seen (None if nothing arrived) once the timeout expires
+        latest = None
+        statuses = self.watch(match_id)
+
+        async def first_change():
+            nonlocal latest
+            async for status in statuses:
+                latest = status
+                if status.status != last_status:
+                    return status
+            return latest
+
+        try:
+            return await asyncio.wait_for(first_change(), timeout)
+        except asyncio.TimeoutError:
+            return latest
+        finally:
+            await statuses.aclose()
+
+    async def _poll(self, watcher):
+        # outlives the request that started it
+        deadline.clear_deadline()
+        client = self.http_clients.get(MATCH)
+        while True:
+            try:
+                status = await self._fetch_status(client, watcher.match_id)
+            except Exception as e:
+                # keep polling; subscribers would otherwise only ever get heartbeats
+                logger.error("Polling match status %s failed unexpectedly: %r", watcher.match_id, e)
+                status = None
+            if status is not None and status != watcher.last_status:
+                watcher.last_status = status
+                for queue in watcher.subscribers:
+                    queue.put_nowait(status)
+                if status.status in TERMINAL_STATUSES:
+                    # late subscribers start a fresh watcher instead of joining a finished one
+                    if self._watchers.get(watcher.match_id) is watcher:
+                        del self._watchers[watcher.match_id]
+                    return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _fetch_status(self, client, match_id):
+        try:
+            response = await client.get(f"/match/status/{match_id}")
+            if response.status_code == 200:
+                return MatchStatus(**response.json())
+        except (httpx.HTTPError, ResponseException, ValueError) as e:
+            logger.warning("Polling match status %s failed: %s", match_id, e)
+            return None
+        if response.status_code == 404:
+            return MatchStatus(matchRequestId=match_id, status="not_found")
+        return None
+
+    async def close(self):
+        watchers, self._watchers = self._watchers, {}
+        for watcher in watchers.values():
+            watcher.task.cancel()
+        await asyncio.gather(*(watcher.task for watcher in watchers.values()), return_exceptions=True)
+
+
+match_status_broadcaster = MatchStatusBroadcaster(poll_interval=settings.match.status_poll_interval)
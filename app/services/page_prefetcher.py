@@ -0,0 +1,34 @@
+import json
+
+from app.models.favourite import FavouritesResponse
+from app.models.match import MatchResponses
+from app.settings import settings
+from app.utils.caches import build_cache
+from framework.cache.json_codec import JsonCodec
+from framework.cache.prefetcher import Prefetcher
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib decoder is used without it
+    orjson = None
+
+
+def has_next_page(page):
+    # page is a paged model or, in pass-through mode, its encoded body
+    if isinstance(page, (bytes, bytearray)):
+        try:
+            body = orjson.loads(page) if orjson is not None else json.loads(page)
+        except ValueError:
+            return False
+        links = body.get("links") if isinstance(body, dict) else None
+        return isinstance(links, dict) and links.get("next") is not None
+    return page.links.next is not None
+
+
+# next pages of /games, /match-requests and /favourites; closed by the app lifespan
+page_prefetcher = Prefetcher(build_cache("prefetch", max_size=settings.cache.prefetch_max_size,
+                                         ttl=settings.cache.prefetch_ttl,
+                                         codec=JsonCodec(models=[FavouritesResponse, MatchResponses])),
+                             enabled=settings.cache.prefetch_enabled,
+                             max_in_flight=settings.cache.prefetch_max_in_flight,
+                             epochs=build_cache("prefetch_epochs", max_size=settings.cache.prefetch_max_size, ttl=300.0))
@@ -1,52 +1,46 @@
 from typing import Any
-import os
-import httpx
 
 from app.models.recom_models import UserActivityRequest, UserActivityResponse, Recommendations
+from app.settings import settings
 from app.services.base_validation_service import BaseValidationService
+from app.services.activity_queue import activity_queue as default_activity_queue
+from app.services.recommendations_cache import recommendations_cache as default_recommendations_cache
 from framework.exceptions.response_exceptions import ResponseException
 from framework.resources.base_resource import BaseResource
 
+# how long /user_activity waits for room in a full queue before answering 503
+ACTIVITY_ENQUEUE_TIMEOUT = settings.activity.enqueue_timeout
 
 
-class RecomService(BaseValidationService):
 
-    def __init__(self):
-        self.RECOM_SERVICE_URL = os.getenv("RECOM_SERVICE_URL", "http://localhost:8005")
-        self.MATCH_SERVICE_URL = os.getenv("MATCH_SERVICE_URL", "http://localhost:8002")
+class RecomService(BaseValidationService):
 
-    @BaseValidationService.validate_token
-    async def perform_activity(self, user_id, user_activity: UserActivityRequest) -> UserActivityResponse:
+    def __init__(self, http_clients=None, game_catalogue=None, activity_queue=None, recommendations_cache=None):
+        super().__init__(http_clients, game_catalogue)
+        self.activity_queue = activity_queue or default_activity_queue
+        self.recommendations_cache = recommendations_cache or default_recommendations_cache
 
-        game_id = user_activity["gameId"]
-        is_valid_game = self.validate_game(game_id)
+    async def _check_game(self, user_activity: UserActivityRequest):
+        is_valid_game = await self.validate_game(user_activity.gameId)
         if not is_valid_game:
             raise ResponseException(status_code=404, message="Game not found")
 
+    @BaseValidationService.validate_token_alongside(_check_game)
+    async def perform_activity(self, user_id, user_activity: UserActivityRequest) -> UserActivityResponse:
+
+        # recorded by the write-behind queue; the caller gets 202 once it is queued
+        user_activity = user_activity.dict()
         user_activity["userId"] = user_id
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.RECOM_SERVICE_URL}/user_activity", json=user_activity)
-            if response.status_code == 200:
-                user_act_response = UserActivityResponse(**response.json())
-                return user_act_response
-            raise ResponseException(status_code=response.status_code, message="Error adding user_activity")
+        if not await self.activity_queue.put(user_activity, timeout=ACTIVITY_ENQUEUE_TIMEOUT):
+            raise ResponseException(status_code=503, message="Too many pending activities, try again later",
+                                    headers={"Retry-After": "1"})
+        return UserActivityResponse(**user_activity)
 
-    # @BaseValidationService.validate_token
+    @BaseValidationService.validate_token
     async def get_recommendations(self, user_id, num_recoms) -> Recommendations:
-        params = {
-            "num_recoms": num_recoms
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.RECOM_SERVICE_URL}/recommendations/{user_id}", params=params)
-            if response.status_code == 200:
-                recom_response = Recommendations(**response.json())
-                return recom_response
-            raise ResponseException(status_code=response.status_code, message="Error fetching recommendations")
-
-    async def validate_game(self, game_id):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.MATCH_SERVICE_URL}/games/{game_id}")
-            if response.status_code == 200:
-                return True
-            return False
+        return await self.get_user_recommendations(user_id, num_recoms)
+
+    async def get_user_recommendations(self, user_id, num_recoms) -> Recommendations:
+        # for callers that have already validated the token, such as /home
+        return await self.recommendations_cache.get(user_id, num_recoms)
@@ -0,0 +1,119 @@
+import time
+import asyncio
+import logging
+
+from app.models.recom_models import Recommendations
+from app.settings import settings
+from app.services.game_catalogue import game_catalogue as default_game_catalogue
+from app.utils.caches import build_cache
+from app.utils.http_clients import http_clients as default_http_clients, RECOM
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.json_codec import JsonCodec
+from framework.cache.ttl_cache import TTLCache
+from framework.exceptions.response_exceptions import ResponseException
+from framework.resilience import deadline
+from framework.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationsCache:
+    # A user's recommendations, fetched `prefetch_count` at a time so that any smaller
+    # num_recoms is served by slicing the cached, ranked list. Entries are invalidated when
+    # the user records new activity or favourites.
+
+    def __init__(self, cache: CacheBackend, http_clients=None, game_catalogue=None, prefetch_count=24,
+                 clock=time.time, invalidations: CacheBackend = None):
+        self.cache = cache
+        self.http_clients = http_clients or default_http_clients
+        self.game_catalogue = game_catalogue or default_game_catalogue
+        self.prefetch_count = prefetch_count
+        self._fetches = SingleFlight()
+        # user_id -> wall-clock time of the last invalidation, so a fetch that started earlier is
+        # not stored; shared like the cache, so that it covers fetches in other workers too
+        self._clock = clock
+        self._invalidated_at = (invalidations if invalidations is not None
+                                else TTLCache(max_size=cache.max_size, ttl=300.0))
+        self._background = set()
+
+    async def get(self, user_id, num_recoms) -> Recommendations:
+        entry = self.cache.get(user_id)
+        if entry is not None:
+            count, recommendations = entry
+            if count >= num_recoms:
+                return self._slice(recommendations, num_recoms)
+
+        count = max(num_recoms, self.prefetch_count)
+        invalidated_at = self._invalidated_at.get(user_id, 0)
+        recommendations = await self._fetches.do((user_id, count, invalidated_at),
+                                                 lambda: self._fetch(user_id, count))
+        return self._slice(recommendations, num_recoms)
+
+    def invalidate(self, user_id):
+        self._invalidated_at.set(user_id, self._clock())
+        self.cache.delete(user_id)
+
+    def refresh(self, user_id):
+        # refetches in the background for users who had recommendations cached
+        cached = user_id in self.cache
+        self.invalidate(user_id)
+        if cached:
+            self.warm(user_id)
+
+    def warm(self, user_id):
+        self._in_background(self._warm(user_id))
+
+    def warm_for_token(self, token, resolve_user_id):
+        # resolves the user in the background too, e.g. right after login
+        self._in_background(self._warm(token, resolve_user_id))
+
+    def _in_background(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _warm(self, user_id, resolve_user_id=None):
+        # not bound by the deadline of the request that triggered it
+        deadline.clear_deadline()
+        try:
+            if resolve_user_id is not None:
+                user_id = await resolve_user_id(user_id)
+            if user_id is not None:
+                await self.get(user_id, self.prefetch_count)
+        except Exception as e:
+            logger.warning("Warming recommendations failed: %s", e)
+
+    async def _fetch(self, user_id, count):
+        started_at = self._clock()
+        response = await self.http_clients.get(RECOM).get(f"/recommendations/{user_id}",
+                                                          params={"num_recoms": count})
+        if response.status_code != 200:
+            raise ResponseException(status_code=response.status_code, message="Error fetching recommendations")
+        recom_data = response.json()
+        games = await self.game_catalogue.hydrate(recom_data.get("games", []))
+        recommendations = Recommendations(**dict(recom_data, games=games))
+        if self._invalidated_at.get(user_id, 0) < started_at:
+            self.cache.set(user_id, (count, recommendations))
+            # another worker may have invalidated in between
+            if self._invalidated_at.get(user_id, 0) >= started_at:
+                self.cache.delete(user_id)
+        return recommendations
+
+    @staticmethod
+    def _slice(recommendations, num_recoms):
+        if len(recommendations.games) <= num_recoms:
+            return recommendations
+        return Recommendations(userId=recommendations.userId, games=recommendations.games[:num_recoms])
+
+    def stats(self):
+        return self.cache.stats()
+
+
+recommendations_cache = RecommendationsCache(build_cache("recommendations",
+                                                         max_size=settings.cache.recom_max_size,
+                                                         ttl=settings.cache.recom_ttl,
+                                                         codec=JsonCodec(models=[Recommendations])),
+                                             prefetch_count=settings.cache.recom_prefetch_count,
+                                             invalidations=build_cache("recommendations_invalidations",
+                                                                       max_size=settings.cache.recom_max_size,
+                                                                       ttl=300.0))
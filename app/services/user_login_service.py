@@ -1,38 +1,49 @@
-import os
-import httpx
-
+from app.settings import settings
 from app.services.base_validation_service import BaseValidationService
+from app.services.recommendations_cache import recommendations_cache as default_recommendations_cache
+from app.utils.http_clients import USER_VALIDATION
 from framework.exceptions.response_exceptions import ResponseException
 from app.models.login import LoginResponse
 from app.models.response import MessageResponse
 
+# fetch recommendations in the background after a login, ready for the first page
+WARM_RECOMMENDATIONS_ON_LOGIN = settings.cache.recom_warm_on_login
+
 
 class UserLoginService(BaseValidationService):
 
-    def __init__(self):
-        super().__init__()
-        self.USER_VALIDATION_SERVICE_URL = os.getenv("USER_VALIDATION_SERVICE_URL", "http://localhost:8001")
+    def __init__(self, http_clients=None, recommendations_cache=None):
+        super().__init__(http_clients)
+        self.recommendations_cache = recommendations_cache or default_recommendations_cache
 
+    @property
+    def user_validation_client(self):
+        return self.http_clients.get(USER_VALIDATION)
 
     async def login(self, access_token):
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{self.USER_VALIDATION_SERVICE_URL}/login-google", headers={"Authorization": f"Bearer {access_token}"})
-                if response.status_code == 200:
-                    return LoginResponse(**response.json())  # Use the new response model
-                raise ResponseException(status_code=response.status_code, message=response.json().get("detail", "Login failed"))
+            response = await self.user_validation_client.post("/login-google", headers={"Authorization": f"Bearer {access_token}"})
+            if response.status_code == 200:
+                login_response = LoginResponse(**response.json())  # Use the new response model
+                if WARM_RECOMMENDATIONS_ON_LOGIN:
+                    self.recommendations_cache.warm_for_token(login_response.access_token, self.resolve_user_id)
+                return login_response
+            raise ResponseException(status_code=response.status_code, message=response.json().get("detail", "Login failed"))
+        except ResponseException:
+            raise
         except Exception as e:
             raise ResponseException(status_code=500, message=f"Service error : {str(e)}")
 
     async def logout(self,token):
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{self.USER_VALIDATION_SERVICE_URL}/logout",headers={"Authorization": f"Bearer {token}"})
-                if response.status_code == 200:
-                    message_response = MessageResponse(message = "Successfully logged out")
-                    return message_response
-                else:
-                    raise ResponseException(status_code=response.status_code, message = response.json().get("detail", "Logout failed"))
+            response = await self.user_validation_client.post("/logout",headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 200:
+                self.evict_token(token)
+                message_response = MessageResponse(message = "Successfully logged out")
+                return message_response
+            else:
+                raise ResponseException(status_code=response.status_code, message = response.json().get("detail", "Logout failed"))
+        except ResponseException:
+            raise
         except Exception as e:
-            print(e)
-            raise ResponseException(status_code=500, message=f"Service Error : {str(e)}")
\ No newline at end of file
+            raise ResponseException(status_code=500, message=f"Service Error : {str(e)}")
@@ -0,0 +1,271 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from framework.clients.http_client_registry import UpstreamConfig
+from framework.utils.env import env_bool, env_float, env_int, env_list, env_str
+
+MATCH = "match"
+CATALOGUE = "catalogue"
+RECOM = "recom"
+USER_VALIDATION = "user_validation"
+
+# upstream -> (env prefix, default base url)
+# The games catalogue and match requests are both configured by MATCH_SERVICE_*, but by default
+# they are separate local services, as they always were
+UPSTREAMS = {
+    MATCH: ("MATCH_SERVICE", "http://localhost:8003"),
+    CATALOGUE: ("MATCH_SERVICE", "http://localhost:8002"),
+    RECOM: ("RECOM_SERVICE", "http://localhost:8005"),
+    USER_VALIDATION: ("USER_VALIDATION_SERVICE", "http://localhost:8001"),
+}
+
+
+class ServerSettings(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 1
+    reload: bool = False
+    graceful_shutdown_seconds: float = 30.0
+    request_deadline_seconds: float = 10.0
+    metrics_timing_sample_rate: float = 0.0
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+
+class HttpSettings(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    upstreams: Dict[str, UpstreamConfig]
+    retry_budget_ratio: float = 0.1
+    retry_budget_min_per_second: float = 10.0
+
+
+class CacheSettings(BaseModel):
+    backend: str = "memory"
+    sqlite_path: Optional[str] = None
+    token_max_size: int = 10000
+    token_ttl: float = 60.0
+    game_max_size: int = 5000
+    game_ttl: float = 600.0
+    game_not_found_ttl: float = 30.0
+    game_lookup_concurrency: int = 10
+    response_max_size: int = 1000
+    response_ttl: float = 30.0
+    response_stale_ttl: float = 120.0
+    recom_max_size: int = 10000
+    recom_ttl: float = 300.0
+    recom_prefetch_count: int = 24
+    recom_warm_on_login: bool = True
+    prefetch_enabled: bool = False
+    prefetch_ttl: float = 10.0
+    prefetch_max_size: int = 10000
+    prefetch_max_in_flight: int = 50
+
+
+class AuthSettings(BaseModel):
+    local_token_verification: bool = False
+    jwt_keys_file: Optional[str] = None
+    jwt_algorithms: List[str] = ["HS256"]
+    jwt_audience: Optional[str] = None
+    jwt_issuer: Optional[str] = None
+    jwt_user_id_claim: str = "user_id"
+    jwt_keys_refresh_seconds: float = 300.0
+    jwt_leeway_seconds: float = 0.0
+    jwt_max_revocations: int = 100000
+
+
+class MatchSettings(BaseModel):
+    fan_out_mode: str = "parallel"
+    passthrough_mode: str = "off"
+    batch_concurrency: int = 8
+    batch_max_items: int = 50
+    status_poll_interval: float = 2.0
+    status_heartbeat: float = 15.0
+    status_max_wait: float = 30.0
+
+
+class SearchSettings(BaseModel):
+    game_index_enabled: bool = True
+    game_index_refresh_seconds: float = 300.0
+    game_index_page_size: int = 500
+    game_index_max_games: int = 100000
+
+
+class HomeSettings(BaseModel):
+    # seconds each /home section may take before it is reported as degraded
+    recommendations_timeout: float = 1.0
+    favourites_timeout: float = 1.0
+    match_requests_timeout: float = 1.0
+
+
+class ProfilingSettings(BaseModel):
+    # the /admin endpoints and request profiling are off unless an admin token is set
+    admin_token: Optional[str] = None
+    sample_interval: float = 0.005
+    request_sample_interval: float = 0.001
+    max_seconds: float = 60.0
+    max_request_profiles: int = 100
+    loop_monitor_enabled: bool = False
+    loop_monitor_interval: float = 0.05
+    loop_lag_threshold: float = 0.1
+
+
+class RateLimitSettings(BaseModel):
+    backend: Optional[str] = None
+    max_keys: int = 100000
+    rate: float = 20.0
+    burst: float = 40.0
+    # header the reverse proxy puts the client address in, e.g. X-Forwarded-For
+    client_address_header: Optional[str] = None
+    trusted_proxies: int = 1
+    # limit name -> {"rate": ..., "burst": ...} from RATE_LIMIT_{NAME}_RATE / _BURST
+    overrides: Dict[str, Dict[str, float]] = {}
+
+
+class ActivitySettings(BaseModel):
+    batch_path: str = "/user_activity/batch"
+    queue_size: int = 10000
+    batch_size: int = 100
+    flush_interval: float = 1.0
+    max_retries: int = 5
+    spill_path: Optional[str] = None
+    enqueue_timeout: float = 0.5
+    flush_timeout: float = 10.0
+
+
+def _rate_limit_overrides():
+    overrides = {}
+    for name in os.environ:
+        match = re.fullmatch(r"RATE_LIMIT_(\w+)_(RATE|BURST)", name)
+        if match and env_str(name) is not None:
+            overrides.setdefault(match.group(1).lower(), {})[match.group(2).lower()] = env_float(name, None)
+    return overrides
+
+
+class Settings(BaseModel):
+    server: ServerSettings
+    http: HttpSettings
+    cache: CacheSettings
+    auth: AuthSettings
+    match: MatchSettings
+    search: SearchSettings
+    home: HomeSettings
+    profiling: ProfilingSettings
+    rate_limits: RateLimitSettings
+    activity: ActivitySettings
+
+    @classmethod
+    def from_env(cls):
+        home_timeout = env_float("HOME_SECTION_TIMEOUT", 1.0)
+        return cls(
+            server=ServerSettings(
+                host=env_str("HOST", "127.0.0.1"),
+                port=env_int("PORT", 8000),
+                workers=env_int("WEB_CONCURRENCY", 1),
+                reload=env_bool("RELOAD", False),
+                graceful_shutdown_seconds=env_float("GRACEFUL_SHUTDOWN_SECONDS", 30.0),
+                request_deadline_seconds=env_float("REQUEST_DEADLINE_SECONDS", 10.0),
+                metrics_timing_sample_rate=env_float("METRICS_TIMING_SAMPLE_RATE", 0.0),
+                compression_enabled=env_bool("COMPRESSION_ENABLED", True),
+                compression_minimum_size=env_int("COMPRESSION_MINIMUM_SIZE", 1024),
+                compression_gzip_level=env_int("COMPRESSION_GZIP_LEVEL", 6),
+                compression_brotli_quality=env_int("COMPRESSION_BROTLI_QUALITY", 4),
+            ),
+            http=HttpSettings(
+                upstreams={name: UpstreamConfig.from_env(name, env_prefix, default_url)
+                           for name, (env_prefix, default_url) in UPSTREAMS.items()},
+                retry_budget_ratio=env_float("RETRY_BUDGET_RATIO", 0.1),
+                retry_budget_min_per_second=env_float("RETRY_BUDGET_MIN_PER_SECOND", 10.0),
+            ),
+            cache=CacheSettings(
+                # several workers share the cache by default, so that a logout is seen by all of them
+                backend=env_str("CACHE_BACKEND", "sqlite" if env_int("WEB_CONCURRENCY", 1) > 1 else "memory"),
+                sqlite_path=env_str("CACHE_SQLITE_PATH"),
+                token_max_size=env_int("TOKEN_CACHE_MAX_SIZE", 10000),
+                token_ttl=env_float("TOKEN_CACHE_TTL", 60.0),
+                game_max_size=env_int("GAME_CACHE_MAX_SIZE", 5000),
+                game_ttl=env_float("GAME_CACHE_TTL", 600.0),
+                game_not_found_ttl=env_float("GAME_CACHE_NOT_FOUND_TTL", 30.0),
+                game_lookup_concurrency=env_int("GAME_LOOKUP_CONCURRENCY", 10),
+                response_max_size=env_int("RESPONSE_CACHE_MAX_SIZE", 1000),
+                response_ttl=env_float("RESPONSE_CACHE_TTL", 30.0),
+                response_stale_ttl=env_float("RESPONSE_CACHE_STALE_TTL", 120.0),
+                recom_max_size=env_int("RECOM_CACHE_MAX_SIZE", 10000),
+                recom_ttl=env_float("RECOM_CACHE_TTL", 300.0),
+                recom_prefetch_count=env_int("RECOM_PREFETCH_COUNT", 24),
+                recom_warm_on_login=env_bool("RECOM_WARM_ON_LOGIN", True),
+                prefetch_enabled=env_bool("PREFETCH_ENABLED", False),
+                prefetch_ttl=env_float("PREFETCH_TTL", 10.0),
+                prefetch_max_size=env_int("PREFETCH_MAX_SIZE", 10000),
+                prefetch_max_in_flight=env_int("PREFETCH_MAX_IN_FLIGHT", 50),
+            ),
+            auth=AuthSettings(
+                local_token_verification=env_bool("LOCAL_TOKEN_VERIFICATION", False),
+                jwt_keys_file=env_str("JWT_KEYS_FILE"),
+                jwt_algorithms=env_list("JWT_ALGORITHMS", ["HS256"]),
+                jwt_audience=env_str("JWT_AUDIENCE"),
+                jwt_issuer=env_str("JWT_ISSUER"),
+                jwt_user_id_claim=env_str("JWT_USER_ID_CLAIM", "user_id"),
+                jwt_keys_refresh_seconds=env_float("JWT_KEYS_REFRESH_SECONDS", 300.0),
+                jwt_leeway_seconds=env_float("JWT_LEEWAY_SECONDS", 0.0),
+                jwt_max_revocations=env_int("JWT_MAX_REVOCATIONS", 100000),
+            ),
+            match=MatchSettings(
+                fan_out_mode=env_str("FAN_OUT_MODE", "parallel"),
+                passthrough_mode=env_str("PASSTHROUGH_MODE", "off"),
+                batch_concurrency=env_int("BATCH_CONCURRENCY", 8),
+                batch_max_items=env_int("BATCH_MAX_ITEMS", 50),
+                status_poll_interval=env_float("MATCH_STATUS_POLL_INTERVAL", 2.0),
+                status_heartbeat=env_float("MATCH_STATUS_HEARTBEAT", 15.0),
+                status_max_wait=env_float("MATCH_STATUS_MAX_WAIT", 30.0),
+            ),
+            search=SearchSettings(
+                game_index_enabled=env_bool("GAME_INDEX_ENABLED", True),
+                game_index_refresh_seconds=env_float("GAME_INDEX_REFRESH_SECONDS", 300.0),
+                game_index_page_size=env_int("GAME_INDEX_PAGE_SIZE", 500),
+                game_index_max_games=env_int("GAME_INDEX_MAX_GAMES", 100000),
+            ),
+            home=HomeSettings(
+                recommendations_timeout=env_float("HOME_RECOMMENDATIONS_TIMEOUT", home_timeout),
+                favourites_timeout=env_float("HOME_FAVOURITES_TIMEOUT", home_timeout),
+                match_requests_timeout=env_float("HOME_MATCH_REQUESTS_TIMEOUT", home_timeout),
+            ),
+            profiling=ProfilingSettings(
+                admin_token=env_str("ADMIN_TOKEN"),
+                sample_interval=env_float("PROFILE_SAMPLE_INTERVAL", 0.005),
+                request_sample_interval=env_float("PROFILE_REQUEST_SAMPLE_INTERVAL", 0.001),
+                max_seconds=env_float("PROFILE_MAX_SECONDS", 60.0),
+                max_request_profiles=env_int("PROFILE_MAX_REQUESTS", 100),
+                loop_monitor_enabled=env_bool("LOOP_MONITOR_ENABLED", False),
+                loop_monitor_interval=env_float("LOOP_MONITOR_INTERVAL", 0.05),
+                loop_lag_threshold=env_float("LOOP_LAG_THRESHOLD", 0.1),
+            ),
+            rate_limits=RateLimitSettings(
+                backend=env_str("RATE_LIMIT_BACKEND"),
+                max_keys=env_int("RATE_LIMIT_MAX_KEYS", 100000),
+                rate=env_float("RATE_LIMIT_RATE", 20.0),
+                burst=env_float("RATE_LIMIT_BURST", 40.0),
+                client_address_header=env_str("RATE_LIMIT_CLIENT_ADDRESS_HEADER"),
+                trusted_proxies=env_int("RATE_LIMIT_TRUSTED_PROXIES", 1),
+                overrides=_rate_limit_overrides(),
+            ),
+            activity=ActivitySettings(
+                batch_path=env_str("USER_ACTIVITY_BATCH_PATH", "/user_activity/batch"),
+                queue_size=env_int("USER_ACTIVITY_QUEUE_SIZE", 10000),
+                batch_size=env_int("USER_ACTIVITY_BATCH_SIZE", 100),
+                flush_interval=env_float("USER_ACTIVITY_FLUSH_INTERVAL", 1.0),
+                max_retries=env_int("USER_ACTIVITY_MAX_RETRIES", 5),
+                spill_path=env_str("USER_ACTIVITY_SPILL_PATH"),
+                enqueue_timeout=env_float("USER_ACTIVITY_ENQUEUE_TIMEOUT", 0.5),
+                flush_timeout=env_float("USER_ACTIVITY_FLUSH_TIMEOUT", 10.0),
+            ),
+        )
+
+
+# Read once, when the app modules are first imported (after main has loaded the .env file)
+settings = Settings.from_env()
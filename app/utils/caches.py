@@ -0,0 +1,44 @@
+import os
+import stat
+import tempfile
+
+from app.settings import settings
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.json_codec import JsonCodec
+from framework.cache.sqlite_cache import SqliteCache
+from framework.cache.ttl_cache import TTLCache
+
+MEMORY = "memory"
+# one SQLite file shared by every worker on the host
+SQLITE = "sqlite"
+
+CACHE_BACKEND = settings.cache.backend
+
+
+def default_sqlite_path():
+    # in a directory of this user's own, since /dev/shm and /tmp are writable by every user
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    directory = os.path.join(base, f"iris-cache-{os.getuid()}" if hasattr(os, "getuid") else "iris-cache")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid())
+            or info.st_mode & 0o077):
+        raise PermissionError(f"Refusing the cache directory {directory}: not a private directory of this user; "
+                              f"set CACHE_SQLITE_PATH")
+    return os.path.join(directory, "iris-cache.sqlite3")
+
+
+def build_cache(namespace, max_size, ttl, clock=None, codec: JsonCodec = None) -> CacheBackend:
+    # clock only applies to the in-memory backend; shared entries expire by wall-clock time.
+    # codec registers the types the shared backend stores besides plain JSON values.
+    if CACHE_BACKEND == SQLITE:
+        return SqliteCache(settings.cache.sqlite_path or default_sqlite_path(), namespace, max_size=max_size, ttl=ttl,
+                           codec=codec)
+    if CACHE_BACKEND != MEMORY:
+        raise ValueError(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}, expected {MEMORY} or {SQLITE}")
+    if clock is None:
+        return TTLCache(max_size=max_size, ttl=ttl)
+    return TTLCache(max_size=max_size, ttl=ttl, clock=clock)
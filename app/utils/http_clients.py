@@ -0,0 +1,9 @@
+from app.settings import settings, CATALOGUE, MATCH, RECOM, USER_VALIDATION
+from framework.clients.http_client_registry import HttpClientRegistry
+from framework.resilience.retry_budget import RetryBudget
+
+# One pooled client per upstream, opened and closed by the app lifespan
+http_clients = HttpClientRegistry(retry_budget=RetryBudget(ratio=settings.http.retry_budget_ratio,
+                                                           min_per_second=settings.http.retry_budget_min_per_second))
+for name, config in settings.http.upstreams.items():
+    http_clients.register(name, config)
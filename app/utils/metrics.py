@@ -0,0 +1,4 @@
+from framework.metrics.registry import MetricsRegistry
+
+# exposed on /metrics in the Prometheus text format
+metrics = MetricsRegistry()
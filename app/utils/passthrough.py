@@ -0,0 +1,9 @@
+from app.settings import settings
+from framework.serialization.passthrough import Passthrough
+
+# off, validate or trusted, see framework/serialization/passthrough.py
+PASSTHROUGH_MODE = settings.match.passthrough_mode
+
+
+def passthrough(model):
+    return Passthrough(model, PASSTHROUGH_MODE)
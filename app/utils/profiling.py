@@ -0,0 +1,15 @@
+from app.settings import settings
+from app.utils.metrics import metrics
+from framework.profiling.loop_monitor import LoopLagMonitor
+from framework.profiling.request_profiler import RequestProfiler
+
+profiling = settings.profiling
+
+# profiles of the requests sent with the X-Profile header, see app/routers/admin.py
+request_profiler = RequestProfiler(interval=profiling.request_sample_interval,
+                                   max_profiles=profiling.max_request_profiles)
+
+# None unless LOOP_MONITOR_ENABLED is on and ADMIN_TOKEN is set, like the rest of profiling;
+# started and stopped by the app lifespan
+loop_monitor = LoopLagMonitor(interval=profiling.loop_monitor_interval, threshold=profiling.loop_lag_threshold,
+                              registry=metrics) if profiling.loop_monitor_enabled and profiling.admin_token else None
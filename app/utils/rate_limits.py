@@ -0,0 +1,80 @@
+import math
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+
+from app.dependencies import get_validation_service
+from app.services.base_validation_service import BaseValidationService, token_cache_key
+from app.settings import settings
+from app.utils.metrics import metrics
+from framework.exceptions.response_exceptions import ResponseException
+from framework.resilience.rate_limiter import InMemoryRateLimitBackend, RateLimiter, load_backend
+
+# RATE_LIMIT_BACKEND="package.module:factory" plugs in a backend shared by several workers
+rate_limit_backend = (load_backend(settings.rate_limits.backend) if settings.rate_limits.backend
+                      else InMemoryRateLimitBackend(max_keys=settings.rate_limits.max_keys))
+
+CLIENT_ADDRESS_HEADER = settings.rate_limits.client_address_header
+TRUSTED_PROXIES = settings.rate_limits.trusted_proxies
+
+rate_limited = metrics.counter("iris_rate_limited_total", "Requests rejected by a rate limit", ("limit", "route"))
+
+# the route's own scheme still answers 401 for a missing token
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+# what a bucket is kept per
+USER = "user"  # the user of the validated token
+TOKEN = "token"  # the token's digest, not validated, for routes that do not require a token
+ADDRESS = "address"  # the client address
+
+
+def rate_limit(name, rate=None, burst=None, key=USER):
+    # A dependency keeping one token bucket per client and route. RATE_LIMIT_{NAME}_RATE and
+    # RATE_LIMIT_{NAME}_BURST override RATE_LIMIT_RATE and RATE_LIMIT_BURST; a rate of 0 disables it.
+    # Requests without a token are always limited per client address.
+    override = settings.rate_limits.overrides.get(name, {})
+    limiter = RateLimiter(rate_limit_backend,
+                          rate=override.get("rate", rate if rate is not None else settings.rate_limits.rate),
+                          burst=override.get("burst", burst if burst is not None else settings.rate_limits.burst))
+
+    async def check_rate_limit(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme),
+                               validation_service: BaseValidationService = Depends(get_validation_service)):
+        if not limiter.enabled:
+            return
+        route = getattr(request.scope.get("route"), "path", None) or request.url.path
+        client = await _client_key(request, validation_service, token, key)
+        wait = await limiter.acquire((name, route, client))
+        if wait > 0:
+            rate_limited.inc(name, route)
+            raise HTTPException(status_code=429, detail="Too many requests",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+    return check_rate_limit
+
+
+async def _client_key(request: Request, validation_service: BaseValidationService, token, key):
+    if token and key == TOKEN:
+        return f"token:{token_cache_key(token)}"
+    if token and key == USER:
+        try:
+            user_id = await validation_service.resolve_user_id(token)
+        except ResponseException as e:
+            raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.headers)
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"address:{client_address(request)}"
+
+
+def client_address(request: Request):
+    # Behind proxies the socket peer is the nearest proxy. Each trusted proxy appends the address
+    # it received the request from, so the entry TRUSTED_PROXIES from the right is the client;
+    # entries further left were sent by the client and are not trusted.
+    if CLIENT_ADDRESS_HEADER is not None:
+        forwarded = request.headers.get(CLIENT_ADDRESS_HEADER)
+        if forwarded:
+            addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+            if addresses:
+                return addresses[-min(TRUSTED_PROXIES, len(addresses))]
+    return request.client.host if request.client else "unknown"
@@ -0,0 +1,118 @@
+# Peak memory and bytes on the wire per request for GET /match-requests with 10, 100 and 1000
+# item pages, for each PASSTHROUGH_MODE and response encoding. The mock match service sends
+# its body in 64 KiB chunks, like a socket read, and the app is called directly as an ASGI app,
+# so the peak only covers what the gateway allocates while serving the request.
+#
+#   python -m benchmarks.bench_payloads --requests 20
+
+import os
+import argparse
+import asyncio
+import tracemalloc
+
+import httpx
+
+# every request comes from the same user; set before the app reads its settings
+os.environ["RATE_LIMIT_RATE"] = "0"
+
+from app.main import app
+from app.services import match_service
+from app.utils.http_clients import http_clients, MATCH, USER_VALIDATION
+from benchmarks.bench_serialization import SIZES, match_requests_page
+from framework.middleware.compression_middleware import brotli
+from framework.serialization.passthrough import MODES
+
+CHUNK_SIZE = 65536
+ENCODINGS = ("identity", "gzip") + (("br",) if brotli is not None else ())
+
+
+def mock_upstreams(page):
+    async def chunks():
+        for start in range(0, len(page), CHUNK_SIZE):
+            yield page[start:start + CHUNK_SIZE]
+
+    def match(request):
+        return httpx.Response(200, content=chunks(), headers={"content-type": "application/json"})
+
+    def user_validation(request):
+        return httpx.Response(200, json={"user_id": "u1"})
+
+    http_clients.override_transport(MATCH, httpx.MockTransport(match))
+    http_clients.override_transport(USER_VALIDATION, httpx.MockTransport(user_validation))
+
+
+async def serve(size, encoding):
+    # one request through the app; returns the status and the body bytes it sent
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/match-requests", "raw_path": b"/match-requests",
+             "query_string": f"page_size={size}".encode(), "root_path": "",
+             "headers": [(b"host", b"bench"), (b"authorization", b"Bearer bench"),
+                         (b"accept-encoding", encoding.encode())],
+             "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    status, sent = None, 0
+    requested, finished = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # a streamed response listens for the client going away
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, sent
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status, sent
+
+
+async def measure(size, mode, encoding, requests):
+    match_service.match_requests_passthrough.mode = mode
+    # warm up caches and the validators
+    for _ in range(3):
+        status, _ = await serve(size, encoding)
+        assert status == 200, status
+
+    peaks, sent = [], 0
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        _, sent = await serve(size, encoding)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    return max(peaks), sent
+
+
+async def main(requests):
+    results = []
+    tracemalloc.start()
+    for size in SIZES:
+        page = match_requests_page(size)
+        mock_upstreams(page)
+        await http_clients.close()
+        async with app.router.lifespan_context(app):
+            for mode in MODES:
+                for encoding in ENCODINGS:
+                    peak, sent = await measure(size, mode, encoding, requests)
+                    results.append({"items": size, "upstream": len(page), "mode": mode, "encoding": encoding,
+                                    "peak_kib": peak / 1024, "sent": sent})
+    tracemalloc.stop()
+
+    print(f"{'items':>6} {'upstream B':>11} {'mode':>9} {'encoding':>9} {'peak KiB':>9} {'sent B':>9} {'ratio':>6}")
+    for result in results:
+        print(f"{result['items']:>6} {result['upstream']:>11} {result['mode']:>9} {result['encoding']:>9} "
+              f"{result['peak_kib']:>9.1f} {result['sent']:>9} {result['sent'] / result['upstream']:>6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory and wire bytes of GET /match-requests per mode and encoding")
+    parser.add_argument("--requests", type=int, default=20, help="requests per page size, mode and encoding")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
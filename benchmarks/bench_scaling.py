@@ -0,0 +1,147 @@
+# Throughput of the gateway as WEB_CONCURRENCY grows. The fakes, each gateway configuration
+# and the load generators run as separate processes on this machine, talking over loopback,
+# so leave cores for the load generators and the fakes when reading the results.
+#
+#   python -m benchmarks.bench_scaling --workers 1,2,4 --duration 15 --cache-backend sqlite --output scaling.json
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+import httpx
+
+from benchmarks.load_test import Recorder, latency_summary, virtual_user, git_commit
+from benchmarks.scenarios import DEFAULT_MIX, parse_mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30.0):
+    stop_at = time.monotonic() + timeout
+    while time.monotonic() < stop_at:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def start_gateway(workers, port, upstream_url, args, cache_path):
+    env = dict(os.environ,
+               WEB_CONCURRENCY=str(workers), HOST="127.0.0.1", PORT=str(port),
+               MATCH_SERVICE_URL=upstream_url, RECOM_SERVICE_URL=upstream_url,
+               USER_VALIDATION_SERVICE_URL=upstream_url,
+               CACHE_BACKEND=args.cache_backend, CACHE_SQLITE_PATH=cache_path,
+               # measure capacity, not the per-user limits
+               RATE_LIMIT_RATE="0")
+    return subprocess.Popen([sys.executable, "-m", "app.main"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def generate_load(index, base_url, args):
+    # runs in a load generator process; returns plain dicts so they pickle back to the parent
+    async def run():
+        recorder = Recorder()
+        weights = parse_mix(args.mix)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            stop_at = time.perf_counter() + args.duration
+            await asyncio.gather(*[virtual_user(index * args.concurrency + worker, client, recorder, weights,
+                                                args, stop_at)
+                                   for worker in range(args.concurrency)])
+        return dict(recorder.latencies), {route: dict(statuses) for route, statuses in recorder.statuses.items()}
+
+    return asyncio.run(run())
+
+
+def measure(workers, upstream_url, args):
+    port = free_port()
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="iris-bench-"), "cache.sqlite3")
+    gateway = start_gateway(workers, port, upstream_url, args, cache_path)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(f"{base_url}/health", gateway)
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.load_processes) as pool:
+            results = pool.starmap(generate_load, [(index, base_url, args) for index in range(args.load_processes)])
+    finally:
+        stop(gateway)
+
+    latencies = [seconds for route_latencies, _ in results for values in route_latencies.values()
+                 for seconds in values]
+    errors = sum(count for _, statuses in results for route_statuses in statuses.values()
+                 for status, count in route_statuses.items()
+                 if status == "transport_error" or int(status) >= 500)
+    return dict(workers=workers, requests=len(latencies), rps=round(len(latencies) / args.duration, 2),
+                errors=errors, **latency_summary(latencies))
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Gateway throughput from 1 to N worker processes")
+    parser.add_argument("--workers", default=",".join(str(2 ** power) for power in range(cpus.bit_length())
+                                                      if 2 ** power <= cpus),
+                        help="comma separated worker counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--load-processes", type=int, default=max(1, cpus // 2), help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users per load generator process")
+    parser.add_argument("--users", type=int, default=1000, help="distinct user tokens")
+    parser.add_argument("--games", type=int, default=500, help="games in the fake catalogue")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--latency", type=float, default=0.005, help="upstream latency in seconds")
+    parser.add_argument("--cache-backend", default="sqlite", choices=("memory", "sqlite"))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    upstream_port = free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    fakes = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_upstreams", "--port", str(upstream_port),
+                              "--games", str(args.games), "--latency", str(args.latency)])
+    try:
+        wait_until_up(f"{upstream_url}/games/g0", fakes)
+        runs = [measure(int(workers), upstream_url, args) for workers in args.workers.split(",")]
+    finally:
+        stop(fakes)
+
+    baseline = runs[0]["rps"] or 1
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for run in runs:
+        run["speedup"] = round(run["rps"] / baseline, 2)
+        print(f"{run['workers']:>7} {run['rps']:>10} {run['speedup']:>8} {run['p50_ms']:>8} "
+              f"{run['p95_ms']:>8} {run['p99_ms']:>8} {run['errors']:>6}")
+
+    if args.output:
+        results = {"meta": {"commit": git_commit(), "cpus": cpus, "timestamp": time.time()},
+                   "config": {key: value for key, value in vars(args).items() if key != "output"},
+                   "runs": runs}
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# CPU per request for GET /match-requests with 10, 100 and 1000 item pages, for each
+# PASSTHROUGH_MODE. The upstreams are in-process mock transports, so the numbers only
+# cover the gateway's own work.
+#
+#   python -m benchmarks.bench_serialization --requests 200
+
+import os
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+# every request comes from the same user; set before the app reads its settings
+os.environ["RATE_LIMIT_RATE"] = "0"
+
+from app.main import app
+from app.services import match_service
+from app.utils.http_clients import http_clients, MATCH, USER_VALIDATION
+from framework.serialization.passthrough import MODES
+
+SIZES = (10, 100, 1000)
+
+
+def match_requests_page(size):
+    match_requests = [{"userId": f"u{i}", "gameId": f"g{i % 50}", "matchRequestId": f"m{i}",
+                       "expireDate": "2030-01-01T00:00:00", "isActive": True, "isCancelled": False,
+                       "links": {"self": {"href": f"/match-requests/m{i}"}}} for i in range(size)]
+    links = {"self": {"href": "/match-requests?page=1"}, "next": {"href": "/match-requests?page=2"}}
+    return json.dumps({"matchRequests": match_requests, "links": links}).encode()
+
+
+def mock_upstreams(page):
+    def match(request):
+        return httpx.Response(200, content=page, headers={"content-type": "application/json"})
+
+    def user_validation(request):
+        return httpx.Response(200, json={"user_id": "u1"})
+
+    http_clients.override_transport(MATCH, httpx.MockTransport(match))
+    http_clients.override_transport(USER_VALIDATION, httpx.MockTransport(user_validation))
+
+
+async def measure(client, size, requests):
+    url = f"/match-requests?page_size={size}"
+    headers = {"Authorization": "Bearer bench"}
+    # warm up caches and the validators
+    for _ in range(5):
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        await client.get(url, headers=headers)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    return cpu / requests * 1000, wall / requests * 1000
+
+
+async def main(requests):
+    results = []
+    for size in SIZES:
+        mock_upstreams(match_requests_page(size))
+        await http_clients.close()
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for mode in MODES:
+                    match_service.match_requests_passthrough.mode = mode
+                    cpu_ms, wall_ms = await measure(client, size, requests)
+                    results.append({"items": size, "mode": mode, "cpu_ms": round(cpu_ms, 3),
+                                    "wall_ms": round(wall_ms, 3)})
+
+    print(f"{'items':>6} {'mode':>9} {'cpu ms/req':>11} {'wall ms/req':>12}")
+    for result in results:
+        print(f"{result['items']:>6} {result['mode']:>9} {result['cpu_ms']:>11.3f} {result['wall_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU per request of GET /match-requests for each PASSTHROUGH_MODE")
+    parser.add_argument("--requests", type=int, default=200, help="requests per page size and mode")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,266 @@
+# In-process stand-ins for the Match, Recommendation and UserValidation services. They are
+# served through httpx.MockTransport, so no sockets are opened and everything runs offline.
+
+import re
+import json
+import random
+import asyncio
+from collections import Counter, defaultdict
+
+import httpx
+
+from app.utils.http_clients import http_clients, CATALOGUE, MATCH, RECOM, USER_VALIDATION
+
+GENRES = ("rpg", "coop", "shooter", "puzzle", "racing", "strategy")
+
+
+class FakeUpstream:
+    # Route handlers are plain functions of (request, **path_params) returning an httpx.Response.
+    # Every call waits `latency` plus up to `jitter` seconds and fails with a 503 at `error_rate`.
+
+    def __init__(self, name, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.routes = []
+        self.calls = Counter()
+
+    def route(self, method, pattern):
+        regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+
+        def register(handler):
+            self.routes.append((method, regex, f"{method} {pattern}", handler))
+            return handler
+        return register
+
+    def find(self, request: httpx.Request):
+        for method, regex, label, handler in self.routes:
+            match = regex.match(request.url.path)
+            if match is not None and method == request.method:
+                return label, handler, match.groupdict()
+        return None
+
+    async def handle(self, request: httpx.Request):
+        route = self.find(request)
+        if route is not None:
+            label, handler, params = route
+            self.calls[label] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if delay:
+                await asyncio.sleep(delay)
+            if self.error_rate and self.random.random() < self.error_rate:
+                return httpx.Response(503, json={"detail": "Injected failure"})
+            return handler(request, **params)
+        self.calls["unmatched"] += 1
+        return httpx.Response(404, json={"detail": "Not Found"})
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+def _game(index):
+    game_id = f"g{index}"
+    return {"gameId": game_id, "title": f"Game {index}", "description": f"Description of game {index}",
+            "image": f"https://images.example/{game_id}.png", "genre": GENRES[index % len(GENRES)],
+            "links": {"self": {"href": f"/games/{game_id}"}}}
+
+
+def _page_links(path, page, page_size, total):
+    links = {"self": {"href": f"{path}?page={page}&page_size={page_size}"}}
+    if page * page_size < total:
+        links["next"] = {"href": f"{path}?page={page + 1}&page_size={page_size}"}
+    if page > 1:
+        links["prev"] = {"href": f"{path}?page={page - 1}&page_size={page_size}"}
+    return links
+
+
+def _paginate(request, items):
+    page = int(request.url.params.get("page", 1))
+    page_size = int(request.url.params.get("page_size", 10))
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, page_size
+
+
+def fake_match_service(games, matched_after=3, **options):
+    upstream = FakeUpstream(MATCH, **options)
+    catalogue = {game["gameId"]: game for game in games}
+    match_requests = {}
+    status_polls = Counter()
+    favourites = defaultdict(list)
+
+    @upstream.route("GET", "/games/{game_id}")
+    def get_game(request, game_id):
+        if game_id not in catalogue:
+            return httpx.Response(404, json={"detail": "Game not found"})
+        return httpx.Response(200, json=catalogue[game_id])
+
+    @upstream.route("GET", "/games")
+    def get_games(request):
+        genre, title = request.url.params.get("genre") or None, request.url.params.get("title") or None
+        matching = [game for game in games
+                    if (genre is None or game["genre"] == genre) and (title is None or title in game["title"])]
+        page_games, page, page_size = _paginate(request, matching)
+        return httpx.Response(200, json={"games": page_games,
+                                         "links": _page_links("/games", page, page_size, len(matching))})
+
+    @upstream.route("GET", "/match-requests/{match_id}")
+    def get_match_request(request, match_id):
+        if match_id not in match_requests:
+            return httpx.Response(404, json={"detail": "Match request not found"})
+        return httpx.Response(200, json=match_requests[match_id])
+
+    @upstream.route("GET", "/match-requests")
+    def get_match_requests(request):
+        user_id = request.url.params.get("user_id")
+        owned = [match_request for match_request in match_requests.values() if match_request["userId"] == user_id]
+        page_requests, page, page_size = _paginate(request, owned)
+        return httpx.Response(200, json={"matchRequests": page_requests,
+                                         "links": _page_links("/match-requests", page, page_size, len(owned))})
+
+    @upstream.route("POST", "/match-requests")
+    def create_match_request(request):
+        match_id = f"m{len(match_requests) + 1}"
+        match_request = dict(json.loads(request.content), matchRequestId=match_id)
+        match_requests[match_id] = dict(match_request, links={"self": {"href": f"/match-requests/{match_id}"}})
+        return httpx.Response(201, json=match_request)
+
+    @upstream.route("POST", "/match-requests/match")
+    def initiate_match(request):
+        match_id = json.loads(request.content)["MatchRequestId"]
+        return httpx.Response(202, json={"message": "Matching started", "matchRequestId": match_id,
+                                         "polling_url": f"/match/status/{match_id}"})
+
+    @upstream.route("GET", "/match/status/{match_id}")
+    def get_match_status(request, match_id):
+        status_polls[match_id] += 1
+        if status_polls[match_id] < matched_after:
+            return httpx.Response(200, json={"matchRequestId": match_id, "status": "matching"})
+        return httpx.Response(200, json={"matchRequestId": match_id, "status": "matched",
+                                         "partnerRequestId": f"partner-{match_id}"})
+
+    @upstream.route("POST", "/favourite")
+    def add_favourite(request):
+        favourite = json.loads(request.content)
+        favourites[favourite["userId"]].append(favourite["gameId"])
+        return httpx.Response(201, json=dict(favourite, favouriteId=f"f{sum(map(len, favourites.values()))}"))
+
+    @upstream.route("POST", "/favourites/{user_id}")
+    def get_favourites(request, user_id):
+        # ids only, so the gateway hydrates them from its game catalogue
+        game_ids, _, _ = _paginate(request, favourites[user_id])
+        return httpx.Response(200, json={"games": game_ids})
+
+    return upstream
+
+
+def fake_recom_service(games, **options):
+    upstream = FakeUpstream(RECOM, **options)
+
+    @upstream.route("GET", "/recommendations/{user_id}")
+    def get_recommendations(request, user_id):
+        num_recoms = int(request.url.params.get("num_recoms", 6))
+        offset = sum(map(ord, user_id)) % len(games)
+        picks = [games[(offset + index) % len(games)] for index in range(num_recoms)]
+        return httpx.Response(200, json={"userId": user_id, "games": picks})
+
+    @upstream.route("POST", "/user_activity")
+    def user_activity(request):
+        return httpx.Response(200, content=request.content, headers={"content-type": "application/json"})
+
+    @upstream.route("POST", "/user_activity/batch")
+    def user_activity_batch(request):
+        return httpx.Response(200, json={"accepted": len(json.loads(request.content)["activities"])})
+
+    return upstream
+
+
+def fake_user_validation_service(**options):
+    upstream = FakeUpstream(USER_VALIDATION, **options)
+
+    def user_id(request):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        return token.replace("bench-", "user-", 1) if token.startswith("bench-") else None
+
+    @upstream.route("POST", "/validate-token")
+    def validate_token(request):
+        if user_id(request) is None:
+            return httpx.Response(401, json={"detail": "Invalid token"})
+        return httpx.Response(200, json={"user_id": user_id(request)})
+
+    @upstream.route("POST", "/logout")
+    def logout(request):
+        return httpx.Response(200, json={"message": "Logged out"})
+
+    return upstream
+
+
+def fake_upstreams(game_count=500, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+    games = [_game(index) for index in range(game_count)]
+    options = {"latency": latency, "jitter": jitter, "error_rate": error_rate, "seed": seed}
+    return {MATCH: fake_match_service(games, **options),
+            RECOM: fake_recom_service(games, **options),
+            USER_VALIDATION: fake_user_validation_service(**options)}
+
+
+def asgi_app(upstreams):
+    # Serves every fake from one ASGI app, for benchmarks that run the gateway in its own processes.
+    # The upstreams' paths do not overlap, so the first one with a matching route answers.
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+
+        body, more_body = b"", True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        url = scope["path"] + ("?" + scope["query_string"].decode() if scope["query_string"] else "")
+        request = httpx.Request(scope["method"], "http://fake" + url,
+                                headers=[(name.decode(), value.decode()) for name, value in scope["headers"]],
+                                content=body)
+
+        upstream = next((upstream for upstream in upstreams.values() if upstream.find(request)), None)
+        if upstream is None:
+            response = httpx.Response(404, json={"detail": "Not Found"})
+        else:
+            response = await upstream.handle(request)
+        await send({"type": "http.response.start", "status": response.status_code,
+                    "headers": [(name.encode(), value.encode()) for name, value in response.headers.items()]})
+        await send({"type": "http.response.body", "body": response.content})
+
+    return app
+
+
+def wire(upstreams):
+    # route the gateway's upstream clients to the fakes; call before the app starts
+    for name, upstream in upstreams.items():
+        http_clients.override_transport(name, upstream.transport())
+    # the fake Match service also serves the games catalogue
+    if MATCH in upstreams:
+        http_clients.override_transport(CATALOGUE, upstreams[MATCH].transport())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the fake upstreams over HTTP")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fakes = fake_upstreams(game_count=args.games, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    uvicorn.run(asgi_app(fakes), host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,212 @@
+# Drives app.main:app in-process with scenario mixes against fake upstreams and reports
+# throughput, latency percentiles and upstream calls per request. The gateway, the load
+# generator and the fakes share one event loop, so compare results from the same machine.
+#
+#   python -m benchmarks.load_test --duration 20 --concurrency 50 --latency 0.005 --output results.json
+#   python -m benchmarks.load_test --compare results.json
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.fake_upstreams import fake_upstreams, wire
+from benchmarks.scenarios import SCENARIOS, DEFAULT_MIX, Session, parse_mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {f"p{int(fraction * 100)}_ms": round(percentile(latencies, fraction) * 1000, 3) if latencies else None
+            for fraction in (0.5, 0.95, 0.99)}
+
+
+class Recorder:
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.scenarios = defaultdict(int)
+        self.scenario_failures = defaultdict(int)
+
+    def record(self, route, status, seconds):
+        self.latencies[route].append(seconds)
+        self.statuses[route]["transport_error" if status is None else str(status)] += 1
+
+    @property
+    def requests(self):
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def errors(self, route):
+        return sum(count for status, count in self.statuses[route].items()
+                   if status == "transport_error" or int(status) >= 500)
+
+
+async def virtual_user(worker, client, recorder, weights, args, stop_at):
+    rng = random.Random(None if args.seed is None else args.seed + worker)
+    names, scenario_weights = list(weights), list(weights.values())
+    while time.perf_counter() < stop_at:
+        name = rng.choices(names, scenario_weights)[0]
+        session = Session(client, rng.randrange(args.users), recorder, rng, args.games, args.think_time)
+        recorder.scenarios[name] += 1
+        try:
+            await SCENARIOS[name](session)
+        except (httpx.HTTPError, ValueError, KeyError):
+            recorder.scenario_failures[name] += 1
+
+
+async def run(args):
+    upstreams = fake_upstreams(game_count=args.games, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, seed=args.seed)
+    wire(upstreams)
+    from app.main import app
+
+    recorder = Recorder()
+    weights = parse_mix(args.mix)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=30) as client:
+            if args.warmup:
+                warmup = Recorder()
+                stop_at = time.perf_counter() + args.warmup
+                await asyncio.gather(*[virtual_user(worker, client, warmup, weights, args, stop_at)
+                                       for worker in range(args.concurrency)])
+                for upstream in upstreams.values():
+                    upstream.calls.clear()
+
+            started_at = time.perf_counter()
+            stop_at = started_at + args.duration
+            await asyncio.gather(*[virtual_user(worker, client, recorder, weights, args, stop_at)
+                                   for worker in range(args.concurrency)])
+            elapsed = time.perf_counter() - started_at
+
+    return report(args, recorder, upstreams, elapsed)
+
+
+def report(args, recorder, upstreams, elapsed):
+    requests = recorder.requests
+    all_latencies = [seconds for latencies in recorder.latencies.values() for seconds in latencies]
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        routes[route] = dict(requests=len(latencies), errors=recorder.errors(route),
+                             statuses=dict(recorder.statuses[route]), **latency_summary(latencies))
+
+    upstream_calls = {name: upstream.total_calls for name, upstream in upstreams.items()}
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "summary": dict(requests=requests, duration_s=round(elapsed, 3),
+                        rps=round(requests / elapsed, 2) if elapsed else 0.0,
+                        errors=sum(route["errors"] for route in routes.values()),
+                        **latency_summary(all_latencies)),
+        "scenarios": {name: {"runs": runs, "failures": recorder.scenario_failures[name]}
+                      for name, runs in recorder.scenarios.items()},
+        "routes": routes,
+        "upstreams": {
+            "calls": upstream_calls,
+            "calls_per_request": {name: round(calls / requests, 3) if requests else None
+                                  for name, calls in upstream_calls.items()},
+            "total_calls_per_request": round(sum(upstream_calls.values()) / requests, 3) if requests else None,
+            "by_route": {name: dict(upstream.calls) for name, upstream in upstreams.items()},
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results):
+    summary = results["summary"]
+    print(f"{summary['requests']} requests in {summary['duration_s']}s: {summary['rps']} req/s, "
+          f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, "
+          f"{summary['errors']} errors, "
+          f"{results['upstreams']['total_calls_per_request']} upstream calls per request")
+    print(f"{'route':<28} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in results["routes"].items():
+        print(f"{route:<28} {stats['requests']:>8} {stats['errors']:>6} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+
+def compare(baseline, results, tolerance):
+    # lower throughput or higher latency than the baseline by more than `tolerance` is a regression
+    regressions = []
+
+    def check(label, before, after, higher_is_better=False):
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        marker = "REGRESSION" if worse > tolerance else ""
+        if marker:
+            regressions.append(label)
+        print(f"{label:<40} {before:>10} -> {after:<10} {change:+.1%} {marker}")
+
+    check("rps", baseline["summary"]["rps"], results["summary"]["rps"], higher_is_better=True)
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        check(key, baseline["summary"][key], results["summary"][key])
+    check("upstream calls per request", baseline["upstreams"]["total_calls_per_request"],
+          results["upstreams"]["total_calls_per_request"])
+    for route, stats in results["routes"].items():
+        if route in baseline["routes"]:
+            check(f"{route} p95_ms", baseline["routes"][route]["p95_ms"], stats["p95_ms"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test of the gateway")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--users", type=int, default=100, help="distinct user tokens")
+    parser.add_argument("--games", type=int, default=500, help="games in the fake catalogue")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--latency", type=float, default=0.005, help="upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.005, help="extra random upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls failing with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="write the JSON results to this file, - for stdout")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(json.load(baseline), results, args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# User journeys driven against the gateway. Each scenario is an async function of a Session
+# and issues the requests a client would for that journey.
+
+import time
+import random
+import asyncio
+
+import httpx
+
+MAX_STATUS_POLLS = 10
+
+
+class Session:
+
+    def __init__(self, client: httpx.AsyncClient, user, recorder, rng: random.Random, game_count, think_time=0.0):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer bench-{user}"}
+        self.recorder = recorder
+        self.random = rng
+        self.game_count = game_count
+        self.think_time = think_time
+
+    def game_id(self):
+        return f"g{self.random.randrange(self.game_count)}"
+
+    async def call(self, route, method, url, **kwargs):
+        # `route` is the label results are grouped under, so ids stay out of it
+        started_at = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(route, None, time.perf_counter() - started_at)
+            raise
+        self.recorder.record(route, response.status_code, time.perf_counter() - started_at)
+        return response
+
+    async def think(self):
+        if self.think_time:
+            await self.sleep(self.think_time)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(self.random.uniform(0.5, 1.5) * seconds)
+
+
+async def browse_catalogue(session: Session):
+    page = session.random.randint(1, 5)
+    response = await session.call("GET /games", "GET", "/games", params={"page": page, "page_size": 10})
+    games = response.json().get("games", []) if response.status_code == 200 else []
+    for game in session.random.sample(games, min(2, len(games))):
+        await session.think()
+        await session.call("GET /games/{id}", "GET", f"/games/{game['gameId']}")
+
+
+async def create_and_poll_match(session: Session):
+    response = await session.call("POST /match-requests", "POST", "/match-requests",
+                                  json={"gameId": session.game_id(), "expireDate": "2030-01-01T00:00:00"})
+    if response.status_code not in (200, 201):
+        return
+    match_id = response.json()["matchRequestId"]
+    await session.think()
+    response = await session.call("POST /match-requests/match", "POST", "/match-requests/match",
+                                  json={"MatchRequestId": match_id})
+    if response.status_code >= 400:
+        return
+    for _ in range(MAX_STATUS_POLLS):
+        await session.think()
+        response = await session.call("GET /match/status/{id}", "GET", f"/match/status/{match_id}")
+        if response.status_code != 200 or response.json().get("status") != "matching":
+            return
+
+
+async def favourites(session: Session):
+    await session.call("POST /favourite", "POST", "/favourite", json={"gameId": session.game_id()})
+    await session.think()
+    await session.call("GET /favourites", "GET", "/favourites", params={"page": 1, "page_size": 5})
+
+
+async def recommendations(session: Session):
+    await session.call("GET /recommendations", "GET", "/recommendations", params={"num_recoms": 6})
+    await session.think()
+    await session.call("POST /user_activity", "POST", "/user_activity",
+                       json={"gameId": session.game_id(), "isMatched": False, "isInterested": True})
+
+
+SCENARIOS = {
+    "browse": browse_catalogue,
+    "match": create_and_poll_match,
+    "favourites": favourites,
+    "recommendations": recommendations,
+}
+
+DEFAULT_MIX = "browse=5,match=2,favourites=2,recommendations=1"
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
@@ -0,0 +1,128 @@
+import json
+import time
+import asyncio
+import hashlib
+import logging
+
+import jwt
+
+from framework.auth.key_sources import KeySource
+from framework.cache.ttl_cache import TTLCache
+from framework.exceptions.response_exceptions import ResponseException
+
+logger = logging.getLogger(__name__)
+
+
+def parse_keys(raw_keys, algorithms):
+    # Returns {kid: key}; a bare PEM key or secret is stored under the None kid
+    raw_keys = raw_keys.strip()
+    try:
+        document = json.loads(raw_keys)
+    except ValueError:
+        return {None: raw_keys}
+
+    jwks = document.get("keys", [document]) if isinstance(document, dict) else []
+    keys = {}
+    for jwk in jwks:
+        try:
+            py_jwk = jwt.PyJWK(jwk, algorithm=jwk.get("alg") or algorithms[0])
+        except (jwt.PyJWKError, jwt.InvalidKeyError) as e:
+            logger.warning("Skipping unusable JWK %s: %s", jwk.get("kid"), e)
+            continue
+        keys[jwk.get("kid")] = py_jwk.key
+    return keys
+
+
+class JwtVerifier:
+
+    def __init__(self, key_source: KeySource, algorithms, audience=None, issuer=None,
+                 user_id_claim="user_id", refresh_interval=300.0, leeway=0.0, revoked=None):
+        self.key_source = key_source
+        self.algorithms = list(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.user_id_claim = user_id_claim
+        self.refresh_interval = refresh_interval
+        self.leeway = leeway
+        # token digest -> True until the token expires; pass a shared cache so every worker sees a logout
+        self.revoked = revoked if revoked is not None else TTLCache(max_size=100000, ttl=86400.0, clock=time.time)
+        self._keys = None
+        self._refresh_task = None
+
+    def load_keys(self):
+        try:
+            keys = parse_keys(self.key_source.load(), self.algorithms)
+        except Exception as e:
+            logger.warning("Could not load JWT verification keys: %s", e)
+            if self._keys is None:
+                self._keys = {}
+            return
+        # swap the whole mapping so readers never see a half-built key set
+        self._keys = keys
+
+    async def start(self):
+        await asyncio.to_thread(self.load_keys)
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await asyncio.to_thread(self.load_keys)
+
+    @staticmethod
+    def token_digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def revoke(self, token):
+        try:
+            expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.InvalidTokenError:
+            expires_at = None
+        ttl = expires_at - time.time() + self.leeway if expires_at else None
+        if ttl is None or ttl > 0:
+            self.revoked.set(self.token_digest(token), True, ttl=ttl)
+
+    def is_revoked(self, token):
+        return self.token_digest(token) in self.revoked
+
+    def verify(self, token):
+        # Returns the user id, raises a 401 for tokens that are provably invalid,
+        # and returns None when the token cannot be verified locally, which includes
+        # before start() has loaded the keys
+        if self._keys is None:
+            return None
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError:
+            return None
+        if header.get("alg") not in self.algorithms:
+            return None
+        key = self._keys.get(header.get("kid"), self._keys.get(None))
+        if key is None:
+            return None
+
+        try:
+            claims = jwt.decode(token, key, algorithms=self.algorithms, audience=self.audience,
+                                issuer=self.issuer, leeway=self.leeway,
+                                options={"require": ["exp"], "verify_aud": self.audience is not None})
+        except jwt.ExpiredSignatureError:
+            raise ResponseException(status_code=401, message="Token has expired")
+        except (jwt.InvalidAudienceError, jwt.InvalidIssuerError):
+            raise ResponseException(status_code=401, message="Invalid token")
+        except jwt.InvalidTokenError:
+            return None
+
+        if self.is_revoked(token):
+            raise ResponseException(status_code=401, message="Token has been revoked")
+        return claims.get(self.user_id_claim) or claims.get("sub")
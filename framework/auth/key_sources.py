@@ -0,0 +1,32 @@
+import os
+from abc import ABC, abstractmethod
+
+
+class KeySource(ABC):
+
+    @abstractmethod
+    def load(self) -> str:
+        # Returns a JWKS document ({"keys": [...]}), a PEM public key or a shared secret
+        raise NotImplementedError()
+
+
+class FileKeySource(KeySource):
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self) -> str:
+        with open(self.path, "r") as key_file:
+            return key_file.read()
+
+
+class EnvKeySource(KeySource):
+
+    def __init__(self, variable):
+        self.variable = variable
+
+    def load(self) -> str:
+        value = os.getenv(self.variable)
+        if not value:
+            raise KeyError(f"{self.variable} is not set")
+        return value
@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+
+
+class CacheBackend(ABC):
+    # A key-value cache with per-entry expiry. Keys are hashable and values plain JSON values,
+    # bytes, tuples or types registered with the backend's JsonCodec, so that backends shared
+    # between processes can store them.
+
+    @abstractmethod
+    def get(self, key, default=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, key) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def __len__(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def __contains__(self, key):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def stats(self):
+        # size, max_size, hits, misses, evictions and invalidations
+        raise NotImplementedError()
@@ -0,0 +1,67 @@
+import json
+import base64
+
+from pydantic import BaseModel
+
+
+class JsonCodec:
+    # Turns cache values into JSON for backends that keep them outside the process. Plain JSON
+    # values, bytes, tuples and the registered types round-trip; a stored document can name a
+    # registered type but never make decode() build anything else, unlike a pickle.
+
+    def __init__(self, models=(), types=None):
+        # models are pydantic models; types maps any other class to (dump, load) functions
+        self._dumpers = {}
+        self._loaders = {}
+        for model in models:
+            self.register(model, lambda value: value.model_dump(mode="json"), model.model_validate)
+        for cls, (dump, load) in (types or {}).items():
+            self.register(cls, dump, load)
+
+    def register(self, cls, dump, load):
+        self._dumpers[cls] = (cls.__name__, dump)
+        self._loaders[cls.__name__] = load
+
+    def encode(self, value) -> bytes:
+        return json.dumps(self._dump(value), separators=(",", ":")).encode()
+
+    def decode(self, data: bytes):
+        # raises ValueError for documents it did not write
+        return self._load(json.loads(data))
+
+    def _dump(self, value):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            return {"$bytes": base64.b64encode(value).decode("ascii")}
+        if isinstance(value, tuple):
+            return {"$tuple": [self._dump(item) for item in value]}
+        if isinstance(value, list):
+            return [self._dump(item) for item in value]
+        if isinstance(value, dict):
+            return {"$dict": [[self._dump(key), self._dump(item)] for key, item in value.items()]}
+        registered = self._dumpers.get(type(value))
+        if registered is None:
+            kind = "model" if isinstance(value, BaseModel) else "type"
+            raise TypeError(f"{type(value).__name__} is not a registered {kind} of this cache")
+        name, dump = registered
+        return {"$type": name, "value": dump(value)}
+
+    def _load(self, data):
+        if isinstance(data, list):
+            return [self._load(item) for item in data]
+        if not isinstance(data, dict):
+            return data
+        if "$bytes" in data:
+            return base64.b64decode(data["$bytes"])
+        if "$tuple" in data:
+            return tuple(self._load(item) for item in data["$tuple"])
+        if "$dict" in data:
+            return {self._load(key): self._load(item) for key, item in data["$dict"]}
+        load = self._loaders.get(data.get("$type"))
+        if load is None:
+            raise ValueError(f"Unknown cached type {data.get('$type')!r}")
+        try:
+            return load(data["value"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Corrupt cached {data['$type']}: {e}") from e
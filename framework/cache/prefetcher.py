@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.ttl_cache import TTLCache
+from framework.clients.resilient_client import ResilientClient
+from framework.resilience import deadline
+from framework.resilience.circuit_breaker import CLOSED
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    # Loads the page a client is expected to ask for next in the background and keeps it in a
+    # short-lived cache, where the request for it finds it (or joins the load still running).
+    # A prefetched entry is served once. Pages that depend on who asks are fetched under the
+    # caller's scope, e.g. the user id, and invalidate(scope) drops them after a write.
+
+    def __init__(self, cache: CacheBackend, enabled=True, max_in_flight=50, epochs: CacheBackend = None):
+        self.cache = cache
+        self.enabled = enabled
+        self.max_in_flight = max_in_flight
+        self._in_flight = {}
+        # scope -> bumped on invalidate(), so older entries can no longer be found; a cache shared
+        # between processes needs shared epochs too, or other processes keep serving old entries
+        self._epochs = epochs if epochs is not None else TTLCache(max_size=10000, ttl=300.0)
+        self.hits = 0
+        self.misses = 0
+        self.issued = 0
+        self.skipped = 0
+        self.failed = 0
+
+    async def get_page(self, key, page, fetch, has_next, client: ResilientClient = None, scope=None):
+        # key identifies the list (endpoint and filters), fetch(page) loads one page and
+        # has_next(result) tells whether another one follows
+        if not self.enabled:
+            return await fetch(page)
+        key = (key, scope, self._epochs.get(scope, 0))
+        result = await self.get((key, page), lambda: fetch(page))
+        if has_next(result):
+            self.prefetch((key, page + 1), lambda: fetch(page + 1), client)
+        return result
+
+    def invalidate(self, scope):
+        if self.enabled:
+            self._epochs.set(scope, self._epochs.get(scope, 0) + 1)
+
+    async def get(self, key, loader):
+        if not self.enabled:
+            return await loader()
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            self.cache.delete(key)
+            return value
+        task = self._in_flight.get(key)
+        if task is not None:
+            try:
+                value = await asyncio.shield(task)
+                self.hits += 1
+                self.cache.delete(key)
+                return value
+            except Exception:
+                pass
+        self.misses += 1
+        return await loader()
+
+    def prefetch(self, key, loader, client: ResilientClient = None):
+        if key in self._in_flight or key in self.cache:
+            return
+        # prefetches only use spare capacity: never a breaker probe or a queued slot
+        if len(self._in_flight) >= self.max_in_flight or (
+                client is not None and (client.breaker.state != CLOSED or client.limiter.saturated())):
+            self.skipped += 1
+            return
+        self.issued += 1
+        task = asyncio.create_task(self._load(key, loader))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+
+    async def _load(self, key, loader):
+        # not bound by the deadline of the request that triggered it
+        deadline.clear_deadline()
+        value = await loader()
+        self.cache.set(key, value)
+        return value
+
+    def _finish(self, key, task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logger.debug("Prefetching %s failed: %s", key, task.exception())
+
+    async def close(self):
+        tasks, self._in_flight = list(self._in_flight.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        cache_stats = self.cache.stats()
+        return {"size": cache_stats["size"], "hits": self.hits, "misses": self.misses,
+                "evictions": cache_stats["evictions"], "issued": self.issued,
+                "skipped": self.skipped, "failed": self.failed}
@@ -0,0 +1,106 @@
+import time
+import asyncio
+import hashlib
+import logging
+
+from fastapi import Response
+
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.json_codec import JsonCodec
+from framework.cache.ttl_cache import TTLCache
+from framework.resilience import deadline
+from framework.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+
+    def __init__(self, body: bytes, stored_at, media_type="application/json"):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.stored_at = stored_at
+        self.media_type = media_type
+
+
+# for entries kept in a shared backend
+CACHED_RESPONSE_CODEC = JsonCodec(types={CachedResponse: (
+    lambda entry: {"body": entry.body.decode("latin-1"), "stored_at": entry.stored_at, "media_type": entry.media_type},
+    lambda data: CachedResponse(data["body"].encode("latin-1"), data["stored_at"], data["media_type"]))})
+
+
+class ResponseCache:
+    # Serialized response bodies with strong ETags. Entries are fresh for `ttl` seconds and
+    # are then served stale for up to `stale_ttl` more while one background reload refreshes them.
+
+    def __init__(self, max_size=1000, ttl=30.0, stale_ttl=120.0, clock=time.monotonic, entries: CacheBackend = None):
+        # entries must expire after ttl + stale_ttl, and a shared one needs a clock every process agrees on
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries = entries if entries is not None else TTLCache(max_size=max_size, ttl=ttl + stale_ttl,
+                                                                     clock=clock)
+        self._loads = SingleFlight()
+        self._refreshing = set()
+        # the event loop only keeps weak references to tasks
+        self._background = set()
+        self.stale_hits = 0
+
+    async def get_or_load(self, key, loader) -> CachedResponse:
+        # loader() returns the body bytes, or raises to leave the cache untouched
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._clock() - entry.stored_at >= self.ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+            return entry
+        return await self._loads.do(key, lambda: self._load(key, loader))
+
+    def invalidate(self, key):
+        self._entries.delete(key)
+
+    def stats(self):
+        return dict(self._entries.stats(), stale_hits=self.stale_hits)
+
+    async def _load(self, key, loader):
+        body = await loader()
+        entry = CachedResponse(body, self._clock())
+        self._entries.set(key, entry)
+        return entry
+
+    def _refresh_in_background(self, key, loader):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            # not bound by the deadline of the request that found the entry stale
+            deadline.clear_deadline()
+            try:
+                await self._loads.do(key, lambda: self._load(key, loader))
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", key, e)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def cached_response(entry: CachedResponse, if_none_match=None, headers=None):
+    response_headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    response_headers.update(headers or {})
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=response_headers)
@@ -0,0 +1,230 @@
+import os
+import stat
+import time
+import sqlite3
+import asyncio
+import logging
+
+from framework.cache.cache_backend import CacheBackend
+from framework.cache.json_codec import JsonCodec
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteCache(CacheBackend):
+    # Entries in a SQLite file that every worker process on the host opens, so an entry stored
+    # by one worker is a hit in the others. Keep the file on local disk or tmpfs such as /dev/shm,
+    # in a directory only this user can write to: whoever can write the file can plant entries.
+    # The file must belong to this user and is created readable by it only. Values are stored
+    # as JSON by `codec`, so entries are never executable. Several caches can share one file
+    # under different namespaces. Hit and miss counters are per process.
+    # Lookups and writes are single-row statements on the calling thread, so on the event loop;
+    # a lookup that finds the file locked for longer than busy_timeout is a miss and such a write
+    # is skipped, which bounds how long they can hold up the loop. Pruning scans the namespace
+    # and runs in a worker thread on its own connection.
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, path, namespace, max_size=1024, ttl=60.0, clock=time.time, busy_timeout=0.05,
+                 codec: JsonCodec = None):
+        self.path = path
+        self.namespace = namespace
+        self.codec = codec or JsonCodec()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self.busy_timeout = busy_timeout
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+        self._pruning = None
+        # entries in the namespace, counted by prune() and __len__
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def connection(self):
+        # opened lazily and again after a fork, since a connection must not cross processes
+        if self._connection is None or self._pid != os.getpid():
+            self._connection, self._pid = self._connect(self.busy_timeout), os.getpid()
+        return self._connection
+
+    def _connect(self, busy_timeout):
+        check_private_file(self.path)
+        connection = sqlite3.connect(self.path, timeout=busy_timeout, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS cache_entries (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                           "value BLOB NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, key)) "
+                           "WITHOUT ROWID")
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (namespace, expires_at)")
+        return connection
+
+    @staticmethod
+    def _key(key):
+        # keys are strings or tuples of plain values, whose repr is stable
+        return repr(key)
+
+    def get(self, key, default=None):
+        try:
+            row = self.connection.execute("SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                                          (self.namespace, self._key(key))).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning("Cache %s lookup failed: %s", self.namespace, e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return default
+        value, expires_at = row
+        if expires_at <= self._clock():
+            # left for prune(), which counts the eviction; deleting here would be a write on the lookup path
+            self.misses += 1
+            return default
+        try:
+            value = self.codec.decode(value)
+        except ValueError as e:
+            logger.warning("Cache %s has an unreadable entry: %s", self.namespace, e)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        try:
+            self.connection.execute("INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) "
+                                    "VALUES (?, ?, ?, ?)",
+                                    (self.namespace, self._key(key), self.codec.encode(value),
+                                     expires_at))
+        except sqlite3.OperationalError as e:
+            logger.warning("Cache %s write skipped: %s", self.namespace, e)
+            return
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune_in_background()
+
+    def _prune_in_background(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.prune()
+            return
+        if self._pruning is None or self._pruning.done():
+            self._pruning = self._in_background(self.prune, "Pruning")
+
+    def _in_background(self, operation, description):
+        # runs operation(connection) in a worker thread on a connection of its own, which waits
+        # for locks as long as it needs to without holding up the loop
+        def run():
+            try:
+                connection = self._connect(busy_timeout=5.0)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("%s cache %s failed: %s", description, self.namespace, e)
+                return
+            try:
+                operation(connection)
+            except sqlite3.Error as e:
+                logger.warning("%s cache %s failed: %s", description, self.namespace, e)
+            finally:
+                connection.close()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            run()
+            return None
+        return loop.run_in_executor(None, run)
+
+    def prune(self, connection=None):
+        # drops expired entries, then the ones closest to expiry while over max_size
+        connection = connection or self.connection
+        expired = connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                                     (self.namespace, self._clock())).rowcount
+        size = self._count(connection)
+        excess = size - self.max_size
+        if excess > 0:
+            connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND key IN (SELECT key FROM cache_entries "
+                               "WHERE namespace = ? ORDER BY expires_at LIMIT ?)",
+                               (self.namespace, self.namespace, excess))
+        self.evictions += expired + max(excess, 0)
+        self.size = min(size, self.max_size)
+
+    def _delete(self, key, connection=None):
+        return (connection or self.connection).execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                                                       (self.namespace, self._key(key))).rowcount > 0
+
+    def delete(self, key):
+        try:
+            deleted = self._delete(key)
+        except sqlite3.OperationalError as e:
+            # an invalidation must not be lost, e.g. a logged-out token, so it is retried off the loop
+            logger.warning("Cache %s delete deferred: %s", self.namespace, e)
+            self._in_background(lambda connection: self._delete(key, connection), "Deleting from")
+            return False
+        if not deleted:
+            return False
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        try:
+            self.connection.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        except sqlite3.OperationalError as e:
+            logger.warning("Cache %s clear deferred: %s", self.namespace, e)
+            self._in_background(lambda connection: connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,)), "Clearing")
+
+    def __len__(self):
+        try:
+            self.size = self._count(self.connection)
+        except sqlite3.OperationalError as e:
+            logger.warning("Cache %s count failed: %s", self.namespace, e)
+        return self.size
+
+    def _count(self, connection):
+        return connection.execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                                  (self.namespace,)).fetchone()[0]
+
+    def __contains__(self, key):
+        try:
+            row = self.connection.execute("SELECT 1 FROM cache_entries WHERE namespace = ? AND key = ? "
+                                          "AND expires_at > ?",
+                                          (self.namespace, self._key(key), self._clock())).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning("Cache %s lookup failed: %s", self.namespace, e)
+            return False
+        return row is not None
+
+    def stats(self):
+        # size is the count as of the last prune, which this starts, since counting scans the namespace
+        self._prune_in_background()
+        return {
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def check_private_file(path):
+    # Creates the file readable and writable by this user only, and refuses one that another
+    # user created or that is not a plain file, e.g. a symlink planted in a shared directory.
+    # SQLite's -wal and -shm files get the same mode and are checked as well.
+    try:
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600))
+    except OSError as e:
+        raise PermissionError(f"Cannot open the cache file {path}: {e}") from e
+    for name in (path, path + "-wal", path + "-shm"):
+        try:
+            info = os.lstat(name)
+        except FileNotFoundError:
+            continue
+        if not stat.S_ISREG(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+            raise PermissionError(f"Refusing the cache file {name}: not a regular file owned by this user")
+        if info.st_mode & 0o077:
+            raise PermissionError(f"Refusing the cache file {name}: other users can access it")
@@ -0,0 +1,155 @@
+import os
+import logging
+import httpx
+from framework.clients.resilient_client import ResilientClient
+from framework.resilience.circuit_breaker import CircuitBreaker
+from framework.resilience.concurrency_limiter import ConcurrencyLimiter
+from framework.resilience.retry_budget import RetryBudget
+from framework.utils.env import env_float, env_int, env_bool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class UpstreamConfig:
+
+    def __init__(self, name, base_url, timeout=5.0, connect_timeout=2.0, max_connections=100,
+                 max_keepalive_connections=20, keepalive_expiry=30.0, http2=False, max_retries=2,
+                 retry_backoff=0.05, retry_backoff_max=1.0, breaker_failure_threshold=5,
+                 breaker_recovery_timeout=10.0, breaker_half_open_calls=1, max_concurrent=100, max_queued=100):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_recovery_timeout = breaker_recovery_timeout
+        self.breaker_half_open_calls = breaker_half_open_calls
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+
+    @classmethod
+    def from_env(cls, name, env_prefix, default_url):
+        # Per-upstream settings (e.g. MATCH_SERVICE_TIMEOUT) override the global HTTP_* ones
+        def setting(suffix, reader, default):
+            return reader(f"{env_prefix}_{suffix}", reader(f"HTTP_{suffix}", default))
+
+        return cls(
+            name=name,
+            base_url=os.getenv(f"{env_prefix}_URL", default_url),
+            timeout=setting("TIMEOUT", env_float, 5.0),
+            connect_timeout=setting("CONNECT_TIMEOUT", env_float, 2.0),
+            max_connections=setting("MAX_CONNECTIONS", env_int, 100),
+            max_keepalive_connections=setting("MAX_KEEPALIVE_CONNECTIONS", env_int, 20),
+            keepalive_expiry=setting("KEEPALIVE_EXPIRY", env_float, 30.0),
+            http2=setting("HTTP2", env_bool, False),
+            max_retries=setting("MAX_RETRIES", env_int, 2),
+            retry_backoff=setting("RETRY_BACKOFF", env_float, 0.05),
+            retry_backoff_max=setting("RETRY_BACKOFF_MAX", env_float, 1.0),
+            breaker_failure_threshold=setting("BREAKER_FAILURE_THRESHOLD", env_int, 5),
+            breaker_recovery_timeout=setting("BREAKER_RECOVERY_TIMEOUT", env_float, 10.0),
+            breaker_half_open_calls=setting("BREAKER_HALF_OPEN_CALLS", env_int, 1),
+            max_concurrent=setting("MAX_CONCURRENT", env_int, 100),
+            max_queued=setting("MAX_QUEUED", env_int, 100),
+        )
+
+
+class HttpClientRegistry:
+
+    def __init__(self, retry_budget=None):
+        self._upstreams = {}
+        self._transports = {}
+        self._clients = {}
+        self._breakers = {}
+        self._limiters = {}
+        self.hooks = []
+        # one budget for every upstream; the app builds it from its settings
+        self.retry_budget = retry_budget or RetryBudget()
+
+    def register(self, name, config: UpstreamConfig):
+        self._upstreams[name] = config
+
+    def override_transport(self, name, transport):
+        # Used by the benchmark harness to route an upstream to an in-process app
+        self._transports[name] = transport
+
+    def config(self, name) -> UpstreamConfig:
+        return self._upstreams[name]
+
+    def add_hook(self, hook):
+        # see ResilientClient.hooks; applies to clients already built as well
+        self.hooks.append(hook)
+
+    def clients(self):
+        return dict(self._clients)
+
+    def breakers(self):
+        return dict(self._breakers)
+
+    def breaker(self, name):
+        return self._breakers.get(name)
+
+    def limiters(self):
+        return dict(self._limiters)
+
+    def limiter(self, name):
+        return self._limiters.get(name)
+
+    def _build_client(self, name):
+        config = self.config(name)
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold=config.breaker_failure_threshold,
+                                     recovery_timeout=config.breaker_recovery_timeout,
+                                     half_open_max_calls=config.breaker_half_open_calls)
+            self._breakers[name] = breaker
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            limiter = ConcurrencyLimiter(config.max_concurrent, config.max_queued)
+            self._limiters[name] = limiter
+        http2 = config.http2
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested for %s but the h2 package is not installed, using HTTP/1.1", name)
+            http2 = False
+
+        client = httpx.AsyncClient(
+            base_url=config.base_url,
+            timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(max_connections=config.max_connections,
+                                max_keepalive_connections=config.max_keepalive_connections,
+                                keepalive_expiry=config.keepalive_expiry),
+            http2=http2,
+            transport=self._transports.get(name),
+        )
+        return ResilientClient(client, name, breaker, self.retry_budget, max_retries=config.max_retries,
+                               backoff_base=config.retry_backoff, backoff_max=config.retry_backoff_max, hooks=self.hooks,
+                               limiter=limiter)
+
+    async def start(self):
+        for name in self._upstreams:
+            if name not in self._clients:
+                self._clients[name] = self._build_client(name)
+
+    def get(self, name) -> ResilientClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            # Created lazily when a service is used outside of the app lifespan
+            client = self._build_client(name)
+            self._clients[name] = client
+        return client
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
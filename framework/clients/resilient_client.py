@@ -0,0 +1,213 @@
+import math
+import time
+import random
+import asyncio
+
+import httpx
+
+from framework.exceptions.response_exceptions import ResponseException
+from framework.metrics.request_timing import timed
+from framework.resilience import deadline
+from framework.resilience.circuit_breaker import CircuitBreaker
+from framework.resilience.concurrency_limiter import ConcurrencyLimiter
+from framework.resilience.retry_budget import RetryBudget
+from framework.utils.single_flight import SingleFlight
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+_UNPARSED = object()
+
+
+class SharedResponse:
+    # An upstream response handed to every coalesced caller. json() is parsed once,
+    # so callers must treat the parsed document as read-only.
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+        self._json = _UNPARSED
+
+    def json(self):
+        if self._json is _UNPARSED:
+            self._json = self._response.json()
+        return self._json
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class ResilientClient:
+    # Wraps an upstream's pooled httpx client with a circuit breaker, a concurrency limit,
+    # budgeted retries for idempotent calls and per-hop timeouts capped by the request deadline
+
+    def __init__(self, client: httpx.AsyncClient, name, breaker: CircuitBreaker, retry_budget: RetryBudget,
+                 max_retries=2, backoff_base=0.05, backoff_max=1.0, hooks=(), limiter: ConcurrencyLimiter = None):
+        self.client = client
+        self.name = name
+        self.breaker = breaker
+        self.retry_budget = retry_budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # objects with started(upstream, method) and finished(upstream, method, status, seconds)
+        self.hooks = hooks
+        self.limiter = limiter or ConcurrencyLimiter(0)
+        self._in_flight_gets = SingleFlight()
+        self.coalesced = 0
+
+    @property
+    def is_closed(self):
+        return self.client.is_closed
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get(self, url, coalesce=True, scope=None, **kwargs):
+        # Identical concurrent GETs (url, params, headers and the caller's scope, e.g. a user id
+        # that is not part of the url) share one upstream call. A caller that is cancelled
+        # leaves the shared call running for the others.
+        if not coalesce:
+            return await self.request("GET", url, **kwargs)
+
+        key = (url, self._freeze(kwargs.get("params")), self._freeze(kwargs.get("headers")), scope)
+        if key in self._in_flight_gets:
+            self.coalesced += 1
+        return await self._in_flight_gets.do(key, lambda: self._shared_get(url, **kwargs))
+
+    async def _shared_get(self, url, **kwargs):
+        return SharedResponse(await self.request("GET", url, **kwargs))
+
+    @staticmethod
+    def _freeze(mapping):
+        if not mapping:
+            return None
+        return tuple(sorted((str(name), str(value)) for name, value in dict(mapping).items()))
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def request(self, method, url, idempotent=None, **kwargs):
+        # idempotent overrides the method-based default, e.g. for read-only POST endpoints
+        with timed("upstream"):
+            return await self._request(method, url, idempotent, **kwargs)
+
+    async def stream(self, method, url, idempotent=None, **kwargs) -> httpx.Response:
+        # Like request(), but returns once the headers have arrived and leaves the body unread.
+        # The caller reads it with aiter_bytes() and must aclose() the response. Retries and
+        # the concurrency slot only cover the call up to the headers.
+        with timed("upstream"):
+            return await self._request(method, url, idempotent, stream=True, **kwargs)
+
+    async def _request(self, method, url, idempotent, stream=False, **kwargs):
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            # an expired deadline is reported before the breaker hands out a half-open probe
+            kwargs["timeout"] = self._hop_timeout()
+            self._check_breaker()
+            # from here on a half-open probe slot may be held: every way out that does not
+            # record a success or a failure must give it back
+            try:
+                await self._acquire_slot(kwargs["timeout"])
+            except BaseException:
+                self.breaker.record_cancelled()
+                raise
+            response, error = None, None
+            try:
+                response = await self._send(method, url, stream, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                self.breaker.record_cancelled()
+                raise
+            finally:
+                self.limiter.release()
+
+            if error is not None or response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+
+            attempt += 1
+            backoff = self._backoff(attempt)
+            if not (idempotent and attempt <= self.max_retries and self._has_time_for(backoff)
+                    and self.retry_budget.try_withdraw()):
+                if response is not None:
+                    return response
+                raise self._upstream_error(error)
+            if stream and response is not None:
+                await response.aclose()
+            await asyncio.sleep(backoff)
+
+    async def _send(self, method, url, stream, **kwargs):
+        if not self.hooks:
+            return await self._send_once(method, url, stream, **kwargs)
+
+        for hook in self.hooks:
+            hook.started(self.name, method)
+        started_at = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._send_once(method, url, stream, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started_at
+            for hook in self.hooks:
+                hook.finished(self.name, method, status, elapsed)
+
+    def _send_once(self, method, url, stream, **kwargs):
+        if not stream:
+            return self.client.request(method, url, **kwargs)
+        return self.client.send(self.client.build_request(method, url, **kwargs), stream=True)
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            raise ResponseException(status_code=503, message=f"The {self.name} service is unavailable",
+                                    headers={"Retry-After": str(math.ceil(self.breaker.retry_after()))})
+
+    async def _acquire_slot(self, timeout):
+        # waits at most the pool timeout for a slot, then sheds the call
+        pool_timeout = (self.client.timeout if timeout is httpx.USE_CLIENT_DEFAULT else timeout).pool
+        if not await self.limiter.acquire(pool_timeout):
+            raise ResponseException(status_code=503, message=f"The {self.name} service is overloaded",
+                                    headers={"Retry-After": "1"})
+
+    def _hop_timeout(self):
+        remaining = deadline.remaining()
+        if remaining is None:
+            return httpx.USE_CLIENT_DEFAULT
+        if remaining <= 0:
+            raise ResponseException(status_code=504, message="Request deadline exceeded")
+
+        def cap(value):
+            return remaining if value is None else min(value, remaining)
+
+        timeout = self.client.timeout
+        return httpx.Timeout(connect=cap(timeout.connect), read=cap(timeout.read),
+                             write=cap(timeout.write), pool=cap(timeout.pool))
+
+    def _backoff(self, attempt):
+        # full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _has_time_for(backoff):
+        remaining = deadline.remaining()
+        return remaining is None or remaining > backoff
+
+    def _upstream_error(self, error):
+        if isinstance(error, httpx.TimeoutException):
+            return ResponseException(status_code=504, message=f"The {self.name} service timed out")
+        return ResponseException(status_code=502, message=f"The {self.name} service is unreachable : {error}")
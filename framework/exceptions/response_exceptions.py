@@ -1,6 +1,7 @@
 
 class ResponseException(Exception):
-    def __init__(self, status_code, message):
+    def __init__(self, status_code, message, headers=None):
         self.status_code = status_code
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        self.headers = headers
+        super().__init__(self.message)
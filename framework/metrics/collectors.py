@@ -0,0 +1,96 @@
+from framework.metrics.registry import Gauge, Counter
+
+
+def cache_collector(caches):
+    # caches: {label: object with stats()} such as TTLCache or ResponseCache
+    def collect():
+        size = Gauge("iris_cache_entries", "Entries held by each cache", ("cache",))
+        hits = Counter("iris_cache_hits_total", "Cache hits", ("cache",))
+        misses = Counter("iris_cache_misses_total", "Cache misses", ("cache",))
+        evictions = Counter("iris_cache_evictions_total", "Entries evicted for size or expiry", ("cache",))
+        hit_ratio = Gauge("iris_cache_hit_ratio", "Hits over lookups since start", ("cache",))
+        for name, cache in caches.items():
+            stats = cache.stats()
+            size.set(stats["size"], name)
+            hits.inc(name, amount=stats["hits"])
+            misses.inc(name, amount=stats["misses"])
+            evictions.inc(name, amount=stats["evictions"])
+            lookups = stats["hits"] + stats["misses"]
+            hit_ratio.set(stats["hits"] / lookups if lookups else 0.0, name)
+        return [size, hits, misses, evictions, hit_ratio]
+    return collect
+
+
+def queue_collector(queues):
+    # queues: {label: WriteBehindQueue}
+    def collect():
+        size = Gauge("iris_queue_items", "Items waiting in each write-behind queue", ("queue",))
+        counters = {outcome: Counter(f"iris_queue_{outcome}_total", help_text, ("queue",))
+                    for outcome, help_text in (("enqueued", "Items accepted, including replayed ones"),
+                                               ("delivered", "Items delivered upstream"),
+                                               ("retries", "Delivery retries"),
+                                               ("rejected", "Items refused because the queue was full"),
+                                               ("spilled", "Items appended to the spill file"),
+                                               ("dropped", "Items lost after retries with nowhere to spill"))}
+        for name, queue in queues.items():
+            stats = queue.stats()
+            size.set(stats["size"], name)
+            for outcome, counter in counters.items():
+                counter.inc(name, amount=stats[outcome])
+        return [size, *counters.values()]
+    return collect
+
+
+def prefetch_collector(prefetchers):
+    # prefetchers: {label: Prefetcher}; hits and misses are reported by cache_collector
+    def collect():
+        prefetches = Counter("iris_prefetch_total", "Background prefetches by outcome", ("prefetcher", "outcome"))
+        for name, prefetcher in prefetchers.items():
+            stats = prefetcher.stats()
+            for outcome in ("issued", "skipped", "failed"):
+                prefetches.inc(name, outcome, amount=stats[outcome])
+        return [prefetches]
+    return collect
+
+
+def search_index_collector(indexes):
+    # indexes: {label: object with stats()} such as GameSearch
+    def collect():
+        size = Gauge("iris_search_index_documents", "Documents in the current index snapshot", ("index",))
+        age = Gauge("iris_search_index_age_seconds", "Age of the current index snapshot", ("index",))
+        refreshes = Counter("iris_search_index_refreshes_total", "Snapshots loaded", ("index",))
+        failures = Counter("iris_search_index_refresh_failures_total", "Snapshot loads that failed", ("index",))
+        queries = Counter("iris_search_queries_total", "Searches by where they were answered", ("index", "served"))
+        for name, index in indexes.items():
+            stats = index.stats()
+            size.set(stats["size"], name)
+            if stats["age"] is not None:
+                age.set(stats["age"], name)
+            refreshes.inc(name, amount=stats["refreshes"])
+            failures.inc(name, amount=stats["failures"])
+            queries.inc(name, "local", amount=stats["local"])
+            queries.inc(name, "upstream", amount=stats["fallbacks"])
+        return [size, age, refreshes, failures, queries]
+    return collect
+
+
+def upstream_collector(http_clients):
+    def collect():
+        state = Gauge("iris_circuit_breaker_open", "1 while the upstream circuit breaker rejects calls",
+                      ("upstream",))
+        for name, breaker in http_clients.breakers().items():
+            state.set(1 if breaker.is_open() else 0, name)
+        coalesced = Counter("iris_upstream_coalesced_total", "GETs served by joining an identical in-flight call",
+                            ("upstream",))
+        for name, client in http_clients.clients().items():
+            coalesced.inc(name, amount=client.coalesced)
+        queued = Gauge("iris_upstream_calls_queued", "Calls waiting for an upstream concurrency slot", ("upstream",))
+        shed = Counter("iris_upstream_shed_total", "Calls rejected because the upstream was at its concurrency limit",
+                       ("upstream",))
+        for name, limiter in http_clients.limiters().items():
+            queued.set(limiter.queued, name)
+            shed.inc(name, amount=limiter.shed)
+        exhausted = Counter("iris_retry_budget_exhausted_total", "Retries skipped because the budget was spent")
+        exhausted.inc(amount=http_clients.retry_budget.exhausted)
+        return [state, coalesced, queued, shed, exhausted]
+    return collect
@@ -0,0 +1,61 @@
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+# phase -> seconds for the current request, only set when the request was sampled
+_phases = ContextVar("request_phases", default=None)
+
+
+class RequestPhases:
+
+    def __init__(self):
+        self.durations = {}
+        self.handler_finished_at = None
+
+    def add(self, phase, seconds):
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+
+def start_sampling():
+    return _phases.set(RequestPhases())
+
+
+def stop_sampling(token):
+    _phases.reset(token)
+
+
+def current_phases():
+    return _phases.get()
+
+
+@contextmanager
+def timed(phase):
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.add(phase, time.perf_counter() - started_at)
+
+
+class TimedRoute(APIRoute):
+    # Marks when the endpoint returns, so the time FastAPI then spends validating
+    # and encoding the response can be reported as the serialization phase
+
+    def __init__(self, path, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **endpoint_kwargs):
+            try:
+                return await endpoint(*args, **endpoint_kwargs)
+            finally:
+                phases = _phases.get()
+                if phases is not None:
+                    phases.handler_finished_at = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
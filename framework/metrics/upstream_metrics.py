@@ -0,0 +1,21 @@
+from framework.metrics.registry import MetricsRegistry
+
+
+class UpstreamMetrics:
+    # Hook for ResilientClient, called around every upstream attempt including retries
+
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.counter("iris_upstream_requests_total", "Upstream HTTP calls",
+                                         ("upstream", "method", "status"))
+        self.latency = registry.histogram("iris_upstream_request_duration_seconds", "Upstream HTTP call latency",
+                                          ("upstream", "method"))
+        self.in_flight = registry.gauge("iris_upstream_requests_in_flight", "Upstream HTTP calls in flight",
+                                        ("upstream",))
+
+    def started(self, upstream, method):
+        self.in_flight.inc(upstream)
+
+    def finished(self, upstream, method, status, seconds):
+        self.in_flight.dec(upstream)
+        self.requests.inc(upstream, method, str(status))
+        self.latency.observe(seconds, upstream, method)
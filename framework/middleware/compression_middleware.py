@@ -0,0 +1,187 @@
+import zlib
+from functools import lru_cache
+
+from framework.metrics.registry import MetricsRegistry
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is offered without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml")
+# events must reach the client as they are sent, not when a compressor block fills up
+UNCOMPRESSED_TYPES = (b"text/event-stream",)
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        # wbits 31 writes the gzip container in one call
+        return zlib.compress(data, self.level, wbits=31)
+
+    def stream(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality=4):
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        compressor = brotli.Compressor(quality=self.quality)
+        return compressor.process, compressor.finish
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding: bytes) -> frozenset:
+    # the codings an Accept-Encoding header allows; clients send few distinct headers
+    accepted = set()
+    for item in accept_encoding.decode("latin-1").split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return frozenset(accepted)
+
+
+class CompressionMiddleware:
+    # Compresses response bodies of at least minimum_size bytes with the first encoding the client
+    # accepts, brotli (when installed) before gzip. The encoders are built once and shared; a
+    # streamed body gets its own compressor and is compressed chunk by chunk as it is sent.
+    # Bodies that are already encoded, event streams and small responses are sent as they are.
+
+    def __init__(self, app, registry: MetricsRegistry = None, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = ([BrotliEncoder(brotli_quality)] if brotli is not None else []) + [GzipEncoder(gzip_level)]
+        self.input_bytes = self.output_bytes = None
+        if registry is not None:
+            self.input_bytes = registry.counter("iris_compression_input_bytes_total",
+                                                "Response body bytes before compression", ("encoding",))
+            self.output_bytes = registry.counter("iris_compression_output_bytes_total",
+                                                 "Response body bytes after compression", ("encoding",))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder = self._negotiate(scope["headers"])
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compress = finish = None
+        bypass = False
+
+        async def send_compressed(message):
+            nonlocal start, compress, finish, bypass
+            if bypass:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if self._compressible(message):
+                    # held back until the first body chunk shows whether the body is worth compressing
+                    start = message
+                else:
+                    bypass = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                start_message, start = start, None
+                if not more_body:
+                    bypass = True
+                    if len(body) < self.minimum_size:
+                        await send(start_message)
+                        await send(message)
+                        return
+                    compressed = encoder.compress(body)
+                    self._count(encoder, len(body), len(compressed))
+                    await send(self._encoded_start(start_message, encoder, len(compressed)))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                length = _header(start_message, b"content-length")
+                if length is not None and length.isdigit() and int(length) < self.minimum_size:
+                    bypass = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compress, finish = encoder.stream()
+                await send(self._encoded_start(start_message, encoder, None))
+
+            chunk = compress(body) if body else b""
+            if not more_body:
+                chunk += finish()
+            self._count(encoder, len(body), len(chunk))
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _negotiate(self, headers):
+        for name, value in headers:
+            if name == b"accept-encoding":
+                accepted = accepted_encodings(value)
+                for encoder in self.encoders:
+                    if encoder.name in accepted or "*" in accepted:
+                        return encoder
+                return None
+        return None
+
+    @staticmethod
+    def _compressible(message):
+        status = message["status"]
+        if status < 200 or status in (204, 304) or _header(message, b"content-encoding") is not None:
+            return False
+        content_type = (_header(message, b"content-type") or b"").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+    @staticmethod
+    def _encoded_start(message, encoder, content_length):
+        headers = []
+        for name, value in message.get("headers", []):
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not value.startswith(b"W/"):
+                # the encoded body differs byte for byte, so its entity tag may only be weak
+                value = b"W/" + value
+            headers.append((name, value))
+        headers.append((b"content-encoding", encoder.name.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return dict(message, headers=headers)
+
+    def _count(self, encoder, input_size, output_size):
+        if self.input_bytes is not None:
+            self.input_bytes.inc(encoder.name, amount=input_size)
+            self.output_bytes.inc(encoder.name, amount=output_size)
+
+
+def _header(message, name):
+    for header_name, value in message.get("headers", []):
+        if header_name == name:
+            return value
+    return None
@@ -0,0 +1,33 @@
+from framework.resilience import deadline
+
+
+class DeadlineMiddleware:
+    # Gives every request a deadline that the upstream clients shrink their timeouts to.
+    # Callers may ask for a shorter one with the X-Request-Timeout header (seconds);
+    # a default_timeout of 0 disables the default deadline.
+
+    def __init__(self, app, default_timeout=10.0, header=b"x-request-timeout"):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self.default_timeout or None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                try:
+                    requested = max(0.0, float(value))
+                    timeout = requested if timeout is None else min(timeout, requested)
+                except ValueError:
+                    pass
+                break
+
+        token = deadline.set_deadline(timeout)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            deadline.reset_deadline(token)
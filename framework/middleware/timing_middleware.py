@@ -0,0 +1,71 @@
+import time
+import random
+
+from framework.metrics import request_timing
+from framework.metrics.registry import MetricsRegistry
+
+
+class TimingMiddleware:
+    # Per-route latency, status counts and in-flight requests. A `sample_rate` share of
+    # requests also records a phase breakdown, returned in a Server-Timing header.
+
+    def __init__(self, app, registry: MetricsRegistry, sample_rate=0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.requests = registry.counter("iris_http_requests_total", "HTTP requests served",
+                                         ("method", "route", "status"))
+        self.latency = registry.histogram("iris_http_request_duration_seconds", "HTTP request latency",
+                                          ("method", "route"))
+        self.in_flight = registry.gauge("iris_http_requests_in_flight", "HTTP requests being served")
+        self.phases = registry.histogram("iris_http_request_phase_seconds",
+                                         "Sampled time spent per request phase", ("route", "phase"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status = 500
+        sampling_token = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            sampling_token = request_timing.start_sampling()
+        phases = request_timing.current_phases() if sampling_token else None
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if phases is not None:
+                    message = self._add_server_timing(message, scope, phases, started_at)
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            self.in_flight.dec()
+            route = self._route(scope)
+            self.requests.inc(scope["method"], route, str(status))
+            self.latency.observe(time.perf_counter() - started_at, scope["method"], route)
+            if sampling_token is not None:
+                request_timing.stop_sampling(sampling_token)
+
+    @staticmethod
+    def _route(scope):
+        # the route template keeps ids out of the labels
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def _add_server_timing(self, message, scope, phases, started_at):
+        now = time.perf_counter()
+        if phases.handler_finished_at is not None:
+            phases.add("serialization", now - phases.handler_finished_at)
+        phases.add("total", now - started_at)
+
+        route = self._route(scope)
+        for phase, seconds in phases.durations.items():
+            self.phases.observe(seconds, route, phase)
+        server_timing = ", ".join(f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in phases.durations.items())
+        headers = list(message.get("headers", [])) + [(b"server-timing", server_timing.encode())]
+        return dict(message, headers=headers)
@@ -0,0 +1,95 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+from framework.metrics.registry import MetricsRegistry
+from framework.profiling.sampler import SamplingThread
+from framework.profiling.stacks import collapse, frame_stack
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopLagMonitor:
+    # Measures how late the event loop runs a timer set every `interval` seconds. A late timer
+    # means something held the loop. A watchdog thread checks the timer's heartbeat: while the
+    # loop has not come back for more than `threshold` seconds, it counts the loop thread's
+    # stack, which names the code blocking it.
+
+    def __init__(self, interval=0.05, threshold=0.1, registry: MetricsRegistry = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.beats = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked = 0
+        self.blocked_samples = Counter()
+        self._task = None
+        self._watchdog = None
+        self._loop_thread = None
+        self._last_beat = None
+        self._stalled = False
+        self.lag = self.blocked_total = None
+        if registry is not None:
+            self.lag = registry.histogram("iris_event_loop_lag_seconds",
+                                          "How late the event loop ran its timer", buckets=LAG_BUCKETS)
+            self.blocked_total = registry.counter("iris_event_loop_blocked_total",
+                                                  "Times the event loop was held for longer than the lag threshold")
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._beat())
+        self._watchdog = SamplingThread(self._watch, self.interval, name="loop-watchdog",
+                                        lower_switch_interval=False)
+        self._watchdog.start()
+
+    async def close(self):
+        task, self._task = self._task, None
+        if task is not None:
+            self._watchdog.stop()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.beats += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if self.lag is not None:
+                self.lag.observe(lag)
+            if lag > self.threshold:
+                self.blocked += 1
+                if self.blocked_total is not None:
+                    self.blocked_total.inc()
+
+    def _watch(self):
+        stalled_for = time.monotonic() - self._last_beat - self.interval
+        if stalled_for <= self.threshold:
+            self._stalled = False
+            return
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = frame_stack(frame)
+        self.blocked_samples[stack] += 1
+        if not self._stalled:
+            self._stalled = True
+            logger.warning("The event loop has been blocked for %.0f ms, in %s",
+                           stalled_for * 1000, " <- ".join(reversed(stack[-3:])))
+
+    def report(self):
+        return {"interval": self.interval, "threshold": self.threshold, "beats": self.beats,
+                "meanLag": self.total_lag / self.beats if self.beats else 0.0, "maxLag": self.max_lag,
+                "blocked": self.blocked, "stacks": collapse(self.blocked_samples)}
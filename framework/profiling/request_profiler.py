@@ -0,0 +1,85 @@
+import sys
+import time
+import asyncio
+import secrets
+import threading
+from collections import Counter, OrderedDict
+
+from framework.profiling.sampler import SamplingThread
+from framework.profiling.stacks import collapse, coroutine_stack, frame_stack
+
+RUNNING = "running"
+AWAITING = "awaiting"
+
+
+class RequestProfile:
+
+    def __init__(self, profile_id, task, method, path):
+        self.profile_id = profile_id
+        self.task = task
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration = None
+        self.samples = Counter()
+
+    def folded(self) -> str:
+        return collapse(self.samples)
+
+    def summary(self):
+        return {"profileId": self.profile_id, "method": self.method, "path": self.path,
+                "startedAt": self.started_at, "duration": self.duration, "samples": sum(self.samples.values())}
+
+
+class RequestProfiler:
+    # Profiles single requests. While any is being profiled, a sampler thread looks at the event
+    # loop every `interval` seconds. When the request's task is the one running, the loop thread's
+    # stack is counted under "running"; otherwise the chain of awaits the task is suspended in is
+    # counted under "awaiting", e.g. an upstream call in a service. The last `max_profiles`
+    # finished profiles are kept.
+
+    def __init__(self, interval=0.001, max_profiles=100, max_active=4):
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self.max_active = max_active
+        self.profiles = OrderedDict()
+        self._active = {}
+        self._thread = None
+        self._loop = None
+        self._loop_thread = None
+
+    def begin(self, method, path):
+        # None when max_active requests are already being profiled
+        if len(self._active) >= self.max_active:
+            return None
+        profile = RequestProfile(secrets.token_hex(8), asyncio.current_task(), method, path)
+        self._active[profile.profile_id] = profile
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._thread = SamplingThread(self._sample, self.interval, name="request-profiler")
+            self._thread.start()
+        return profile
+
+    def end(self, profile: RequestProfile):
+        profile.duration = time.time() - profile.started_at
+        self._active.pop(profile.profile_id, None)
+        self.profiles[profile.profile_id] = profile
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+        if not self._active and self._thread is not None:
+            thread, self._thread = self._thread, None
+            thread.stop()
+
+    def get(self, profile_id):
+        return self.profiles.get(profile_id)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._loop_thread)
+        running = asyncio.current_task(self._loop)
+        for profile in list(self._active.values()):
+            if profile.task is running and frame is not None:
+                stack = (RUNNING,) + frame_stack(frame)
+            else:
+                stack = (AWAITING,) + coroutine_stack(profile.task.get_coro())
+            profile.samples[stack] += 1
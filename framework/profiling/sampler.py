@@ -0,0 +1,95 @@
+import sys
+import asyncio
+import threading
+from collections import Counter
+
+from framework.profiling.stacks import frame_stack
+
+_switch_interval_lock = threading.Lock()
+_switch_interval_users = 0
+_original_switch_interval = None
+
+# idents of the running sampling threads, which profiles leave out
+sampling_threads = set()
+
+
+def _lower_switch_interval(interval):
+    # A busy event loop thread only hands the GIL over every switch interval (5 ms by default),
+    # which would cap the sampling rate. It is lowered while any sampler runs.
+    global _switch_interval_users, _original_switch_interval
+    with _switch_interval_lock:
+        if _switch_interval_users == 0:
+            _original_switch_interval = sys.getswitchinterval()
+        _switch_interval_users += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval))
+
+
+def _restore_switch_interval():
+    global _switch_interval_users
+    with _switch_interval_lock:
+        _switch_interval_users -= 1
+        if _switch_interval_users == 0:
+            sys.setswitchinterval(_original_switch_interval)
+
+
+class SamplingThread:
+    # Calls sample() every `interval` seconds from a daemon thread until stopped
+
+    def __init__(self, sample, interval, name="sampler", lower_switch_interval=True):
+        self.sample = sample
+        self.interval = interval
+        self.lower_switch_interval = lower_switch_interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    @property
+    def ident(self):
+        return self._thread.ident
+
+    def start(self):
+        if self.lower_switch_interval:
+            _lower_switch_interval(self.interval)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        if self.lower_switch_interval:
+            _restore_switch_interval()
+
+    def _run(self):
+        sampling_threads.add(threading.get_ident())
+        try:
+            while not self._stopped.wait(self.interval):
+                self.sample()
+        finally:
+            sampling_threads.discard(threading.get_ident())
+
+
+class StackSampler:
+    # Statistical profile of the whole process: the stack of every thread is counted every
+    # `interval` seconds. The event loop thread waiting for I/O shows up in the selector's select().
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+        self._thread_names = {}
+
+    async def run(self, seconds) -> Counter:
+        self._thread = SamplingThread(self._sample, self.interval, name="stack-sampler")
+        self._thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._thread.stop()
+        return self.samples
+
+    def _sample(self):
+        frames = sys._current_frames()
+        if frames.keys() - self._thread_names.keys():
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in frames.items():
+            if thread_id not in sampling_threads:
+                thread_name = self._thread_names.get(thread_id, str(thread_id))
+                self.samples[(thread_name,) + frame_stack(frame)] += 1
@@ -0,0 +1,43 @@
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code):
+    # "qualified name (package/module.py)", so frames from different packages stay apart
+    directory, filename = os.path.split(code.co_filename)
+    return f"{code.co_qualname} ({os.path.basename(directory)}/{filename})"
+
+
+def frame_stack(frame):
+    # the labels of a thread's frames, outermost first
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def coroutine_stack(coroutine):
+    # the chain of awaits a suspended coroutine is waiting in, outermost first; the last entry
+    # names what it waits for when that is not a coroutine, such as a future
+    labels = []
+    while coroutine is not None:
+        frame = getattr(coroutine, "cr_frame", None) or getattr(coroutine, "ag_frame", None) \
+            or getattr(coroutine, "gi_frame", None)
+        if frame is None:
+            if not hasattr(coroutine, "cr_code"):
+                labels.append(f"<{type(coroutine).__name__}>")
+            break
+        labels.append(frame_label(frame.f_code))
+        coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "ag_await", None) \
+            or getattr(coroutine, "gi_yieldfrom", None)
+    return tuple(labels)
+
+
+def collapse(samples) -> str:
+    # the "folded" format read by flamegraph.pl, speedscope and similar tools: one line per
+    # stack, frames joined by ";", followed by the number of samples
+    lines = [";".join(stack) + f" {count}" for stack, count in samples.most_common()]
+    return "\n".join(lines) + "\n" if lines else ""
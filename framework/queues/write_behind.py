@@ -0,0 +1,246 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from framework.resilience import deadline
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; there each worker needs its own spill file
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    # Buffers JSON-serializable items in a bounded queue and delivers them from a background
+    # task with `sink(batch)`, in batches of up to batch_size or whatever arrived within
+    # flush_interval. sink returns the items it could not deliver yet, or raises to retry the
+    # whole batch. Failed batches are retried with backoff, which holds up the queue, so
+    # producers see backpressure: put() refuses items once the queue stays full. With spill_path,
+    # items still undelivered after their retries and items left at shutdown are appended to
+    # that file as JSON lines, and replayed on start and whenever a delivery succeeds with the
+    # queue empty. File access runs in a thread, one spill or replay at a time per queue, under
+    # a lock file so that workers can share the spill file.
+
+    def __init__(self, sink, max_size=10000, batch_size=100, flush_interval=1.0, max_retries=5,
+                 backoff_base=0.5, backoff_max=30.0, spill_path=None, name="write-behind"):
+        self.sink = sink
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.spill_path = spill_path
+        self.name = name
+        self._queue = None
+        self._consumer = None
+        self._closing = False
+        # taken off the queue and not yet delivered, spilled or dropped
+        self._in_flight = []
+        self.enqueued = 0
+        self.delivered = 0
+        self.retries = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    @property
+    def queue(self):
+        # created on first use so it binds to the running loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    def __len__(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self._consumer is None or self._consumer.done():
+            self._closing = False
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def put(self, item, timeout=0.0) -> bool:
+        # Waits up to `timeout` for room. Returns False when the item was not queued.
+        if self._closing:
+            self.rejected += 1
+            return False
+        self.start()
+        try:
+            if timeout:
+                await asyncio.wait_for(self.queue.put(item), timeout)
+            else:
+                self.queue.put_nowait(item)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def close(self, timeout=10.0):
+        # delivers what is queued within timeout, then spills or drops the rest
+        if self._consumer is None:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%s: %d items left undelivered at shutdown", self.name, len(self) + len(self._in_flight))
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
+
+        # the batch the consumer was delivering when it was cancelled, then the queue
+        leftover, self._in_flight = self._in_flight, []
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+            self.queue.task_done()
+        if leftover and not await self._spill(leftover):
+            self.dropped += len(leftover)
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+        }
+
+    async def _consume(self):
+        # deliveries outlive the request that happened to start the consumer
+        deadline.clear_deadline()
+        await self._replay_spilled()
+        while True:
+            batch = await self._next_batch()
+            try:
+                delivered = await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            self._in_flight = []
+            if delivered and self.spill_path and self.queue.empty() and not self._closing:
+                await self._replay_spilled()
+
+    async def _next_batch(self):
+        batch = self._in_flight = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        flush_at = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = flush_at - loop.time()
+            if remaining <= 0 or self._closing:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _deliver(self, batch) -> bool:
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                pending = await self.sink(pending) or []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("%s: delivering %d items failed: %s", self.name, len(pending), e)
+            self.delivered += len(batch) - len(pending)
+            batch = self._in_flight = pending
+            if not pending:
+                return True
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+        logger.error("%s: giving up on %d items after %d retries", self.name, len(pending), self.max_retries)
+        # a spill that has started finishes in its thread even if the consumer is cancelled
+        self._in_flight = []
+        if not await self._spill(pending):
+            self.dropped += len(pending)
+        return False
+
+    async def _spill(self, items) -> bool:
+        if not self.spill_path:
+            return False
+        try:
+            await asyncio.to_thread(self._append, items)
+        except OSError as e:
+            logger.error("%s: could not spill %d items to %s: %s", self.name, len(items), self.spill_path, e)
+            return False
+        self.spilled += len(items)
+        return True
+
+    async def _replay_spilled(self):
+        if not self.spill_path:
+            return
+        taking = asyncio.ensure_future(asyncio.to_thread(self._take_spilled))
+        try:
+            items = await asyncio.shield(taking)
+        except asyncio.CancelledError:
+            # the thread removes the file regardless; hand its items to close() to spill again
+            await asyncio.wait([taking])
+            if taking.exception() is None:
+                self._in_flight.extend(taking.result())
+            raise
+        except OSError as e:
+            logger.error("%s: could not replay %s: %s", self.name, self.spill_path, e)
+            return
+        overflow = []
+        for item in items:
+            try:
+                self.queue.put_nowait(item)
+                self.enqueued += 1
+            except asyncio.QueueFull:
+                overflow.append(item)
+        if overflow and not await self._spill(overflow):
+            self.dropped += len(overflow)
+
+    @contextmanager
+    def _locked(self):
+        # serializes spill file access between the workers sharing it
+        if fcntl is None:
+            yield
+            return
+        with open(self.spill_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _append(self, items):
+        with self._locked(), open(self.spill_path, "a") as spill_file:
+            spill_file.writelines(json.dumps(item) + "\n" for item in items)
+            spill_file.flush()
+            os.fsync(spill_file.fileno())
+
+    def _take_spilled(self):
+        # reads and removes the spill file, so that no other worker replays the same items
+        items = []
+        with self._locked():
+            if not os.path.exists(self.spill_path):
+                return items
+            with open(self.spill_path) as spill_file:
+                for line in spill_file:
+                    if not line.strip():
+                        continue
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        logger.warning("%s: skipping a corrupt line in %s", self.name, self.spill_path)
+            os.remove(self.spill_path)
+        return items
@@ -0,0 +1,56 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive failures, rejects calls for `recovery_timeout`
+    # seconds, then lets `half_open_max_calls` probes through to decide whether to close again
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=10.0, half_open_max_calls=1,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self._clock() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+        if self.half_open_calls < self.half_open_max_calls:
+            self.half_open_calls += 1
+            return True
+        return False
+
+    def is_open(self):
+        return self.state == OPEN and self._clock() - self.opened_at < self.recovery_timeout
+
+    def retry_after(self):
+        return max(0.0, self.recovery_timeout - (self._clock() - self.opened_at))
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_cancelled(self):
+        # a probe that never finished must not keep the half-open slot
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self._clock()
@@ -0,0 +1,48 @@
+import asyncio
+
+
+class ConcurrencyLimiter:
+    # Caps the calls in flight to an upstream. Up to max_queued callers wait for a slot and
+    # the rest are rejected straight away, before the connection pool's own queue fills up.
+
+    def __init__(self, limit, max_queued=0):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+
+    @property
+    def enabled(self):
+        return self._semaphore is not None
+
+    def saturated(self):
+        return self.enabled and self._semaphore.locked()
+
+    async def acquire(self, timeout=None) -> bool:
+        if not self.enabled:
+            return True
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            return True
+        if self.queued >= self.max_queued:
+            self.shed += 1
+            return False
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            self.in_flight += 1
+            return True
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.queued -= 1
+
+    def release(self):
+        if self.enabled:
+            self.in_flight -= 1
+            self._semaphore.release()
@@ -0,0 +1,31 @@
+import time
+from contextvars import ContextVar
+
+# absolute time.monotonic() by which the current request must be answered
+_deadline = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds):
+    return _deadline.set(time.monotonic() + seconds if seconds is not None else None)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def extend_deadline(seconds):
+    # for requests that spend part of their time waiting on purpose, such as long polls
+    deadline = _deadline.get()
+    return _deadline.set(deadline + seconds if deadline is not None else None)
+
+
+def clear_deadline():
+    # for long-lived background tasks, which inherit the context of the request that started them
+    _deadline.set(None)
+
+
+def remaining():
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
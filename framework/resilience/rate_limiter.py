@@ -0,0 +1,82 @@
+import time
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class RateLimitBackend(ABC):
+
+    @abstractmethod
+    async def acquire(self, key, rate, burst) -> float:
+        # Takes a token from the bucket for key, which refills at `rate` tokens per second up to
+        # `burst`. Returns 0 when a token was taken, else the seconds until one is available.
+        raise NotImplementedError()
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    # Token buckets for one process. A bucket that has refilled is the same as no bucket, so
+    # those are dropped as they are found, and at most max_keys buckets are kept.
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [tokens, updated_at, full_at], least recently used first
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def acquire(self, key, rate, burst) -> float:
+        return self.take(key, rate, burst)
+
+    def take(self, key, rate, burst) -> float:
+        now = self.clock()
+        # only a new key needs room; evicting for a known one could drop its own bucket
+        self._evict(now, adding=key not in self._buckets)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(burst)
+        else:
+            tokens = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            self._buckets.move_to_end(key)
+
+        if tokens < 1:
+            wait = (1 - tokens) / rate
+        else:
+            tokens -= 1
+            wait = 0.0
+        self._buckets[key] = [tokens, now, now + (burst - tokens) / rate]
+        return wait
+
+    def _evict(self, now, adding=True):
+        # checks the least recently used buckets only, which keeps this O(1) amortized
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now and (not adding or len(self._buckets) < self.max_keys):
+                break
+            del self._buckets[key]
+
+
+def load_backend(path) -> RateLimitBackend:
+    # "package.module:factory", called without arguments, e.g. a backend shared by several workers
+    module_name, _, attribute = path.partition(":")
+    factory = getattr(importlib.import_module(module_name), attribute)
+    return factory()
+
+
+class RateLimiter:
+
+    def __init__(self, backend: RateLimitBackend, rate, burst):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    async def acquire(self, key) -> float:
+        if not self.enabled:
+            return 0.0
+        return await self.backend.acquire(key, self.rate, self.burst)
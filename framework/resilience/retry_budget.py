@@ -0,0 +1,33 @@
+import time
+
+
+class RetryBudget:
+    # Retries may add at most `ratio` extra calls per original call, plus `min_per_second`
+    # so that low traffic can still retry. Shared by every upstream so a slow dependency
+    # cannot turn into a retry storm.
+
+    def __init__(self, ratio=0.1, min_per_second=10.0, window=10.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(1.0, min_per_second * window)
+        self._clock = clock
+        self._balance = self.capacity
+        self._updated_at = clock()
+        self.exhausted = 0
+
+    def _refill(self):
+        now = self._clock()
+        self._balance = min(self.capacity, self._balance + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self):
+        self._refill()
+        self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def try_withdraw(self):
+        self._refill()
+        if self._balance >= 1.0:
+            self._balance -= 1.0
+            return True
+        self.exhausted += 1
+        return False
@@ -0,0 +1,94 @@
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+
+NO_DOCUMENTS = ()
+
+
+def normalize(text):
+    # case- and accent-insensitive form: "Pokémon" and "POKEMON" both become "pokemon"
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class Filter:
+    # The documents matching one condition. `candidates` lists a superset of them in document
+    # order and accepts(position) confirms a single one; `exact` means every candidate matches.
+
+    def __init__(self, candidates, accepts, exact=False):
+        self.candidates = candidates
+        self.accepts = accepts
+        self.exact = exact
+
+
+def find(filters, document_count, start=0, limit=10):
+    # Up to `limit` positions of the documents passing every filter, in document order, after
+    # skipping the first `start` of them, and whether more follow. The filter with the fewest
+    # candidates drives the scan and the others are checked per document, so the work grows
+    # with the page being read rather than with the number of matches.
+    if not filters:
+        return list(range(document_count)[start:start + limit]), start + limit < document_count
+
+    driver = min(filters, key=lambda f: len(f.candidates))
+    checks = [f.accepts for f in filters if f is not driver or not driver.exact]
+    if not checks:
+        positions = driver.candidates[start:start + limit + 1]
+    else:
+        matches = (position for position in driver.candidates if all(check(position) for check in checks))
+        positions = list(islice(matches, start, start + limit + 1))
+    return positions[:limit], len(positions) > limit
+
+
+class NgramIndex:
+    # Substring search over short texts such as titles. Every 1-, 2- and 3-gram of a normalized
+    # text lists the documents containing it, so a query of up to 3 characters is answered by
+    # one posting list and a longer one scans the shortest list among its trigrams.
+    # Documents must be added in position order.
+
+    def __init__(self, n=3):
+        self.n = n
+        self._postings = defaultdict(list)
+        self._texts = {}
+
+    def add(self, position, text):
+        if not text:
+            return
+        text = normalize(text)
+        self._texts[position] = text
+        grams = {text[start:start + size] for size in range(1, self.n + 1) for start in range(len(text) - size + 1)}
+        for gram in grams:
+            self._postings[gram].append(position)
+
+    def search(self, query) -> Filter:
+        query = normalize(query)
+        texts = self._texts
+
+        def accepts(position):
+            text = texts.get(position)
+            return text is not None and query in text
+
+        if len(query) <= self.n:
+            return Filter(self._postings.get(query, NO_DOCUMENTS), accepts, exact=True)
+        grams = {query[start:start + self.n] for start in range(len(query) - self.n + 1)}
+        shortest = min((self._postings.get(gram, NO_DOCUMENTS) for gram in grams), key=len)
+        return Filter(shortest, accepts)
+
+
+class TermIndex:
+    # Exact, case- and accent-insensitive match on a single-valued field such as a genre.
+    # Documents must be added in position order.
+
+    def __init__(self):
+        self._postings = defaultdict(list)
+        self._terms = {}
+
+    def add(self, position, term):
+        if term:
+            term = normalize(term)
+            self._terms[position] = term
+            self._postings[term].append(position)
+
+    def search(self, term) -> Filter:
+        term = normalize(term)
+        terms = self._terms
+        return Filter(self._postings.get(term, NO_DOCUMENTS), lambda position: terms.get(position) == term, exact=True)
@@ -0,0 +1,54 @@
+from typing import Any
+
+import httpx
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    # Encodes with orjson when it is installed. Bytes are taken to be an already encoded
+    # JSON document and are sent as they are.
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    # Forwards an upstream body opened with ResilientClient.stream() as its chunks arrive. The
+    # upstream is closed when the response is done, even if the body was never started, e.g.
+    # because the client went away first.
+
+    def __init__(self, upstream: httpx.Response, **kwargs):
+        super().__init__(upstream.aiter_bytes(), **kwargs)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+
+def streamed_response(upstream: httpx.Response):
+    headers = {}
+    if "content-length" in upstream.headers and "content-encoding" not in upstream.headers:
+        headers["content-length"] = upstream.headers["content-length"]
+    return UpstreamStreamingResponse(upstream, headers=headers, media_type="application/json")
+
+
+def passthrough_response(result):
+    # services return bytes when an upstream body is passed through, or the upstream
+    # response itself when it is streamed
+    if isinstance(result, bytes):
+        return FastJSONResponse(result)
+    if isinstance(result, httpx.Response):
+        return streamed_response(result)
+    return result
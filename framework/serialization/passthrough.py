@@ -0,0 +1,37 @@
+from pydantic import TypeAdapter
+
+OFF = "off"
+# validate the upstream body against the model once and re-encode it
+VALIDATE = "validate"
+# send the upstream body as it is, for upstreams whose contract is trusted
+TRUSTED = "trusted"
+# as trusted, and endpoints that support it forward the upstream body chunk by chunk as it arrives
+STREAM = "stream"
+
+MODES = (OFF, VALIDATE, TRUSTED, STREAM)
+
+
+class Passthrough:
+    # Turns an upstream JSON body into response bytes without building the model in Python
+    # and having FastAPI validate and encode it a second time for the response_model
+
+    def __init__(self, model, mode=OFF):
+        if mode not in MODES:
+            raise ValueError(f"Unknown pass-through mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.model = model
+        self.mode = mode
+        self.adapter = TypeAdapter(model)
+
+    @property
+    def enabled(self):
+        return self.mode != OFF
+
+    @property
+    def streamed(self):
+        return self.mode == STREAM
+
+    def body(self, content: bytes) -> bytes:
+        if self.mode in (TRUSTED, STREAM):
+            return content
+        # like response_model, this drops fields the model does not declare
+        return self.adapter.dump_json(self.adapter.validate_json(content))
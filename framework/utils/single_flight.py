@@ -0,0 +1,30 @@
+import asyncio
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one in-flight execution of fn
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # shield so that one caller being cancelled does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # mark the exception as retrieved in case every waiter went away
+            task.exception()
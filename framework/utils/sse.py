@@ -0,0 +1,9 @@
+def format_sse(data, event=None):
+    # One Server-Sent Events frame; `data` must already be serialized to a single line
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {data}\n\n"
+
+
+def sse_comment(text=""):
+    # Comment frames are ignored by EventSource and keep idle connections open
+    return f": {text}\n\n"
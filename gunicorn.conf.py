@@ -0,0 +1,12 @@
+# gunicorn launcher, for preloading the app in the master before the workers fork, so they
+# share its imported code and start faster:
+#   gunicorn app.main:app -c gunicorn.conf.py
+# `kill -HUP` on the master reloads the workers gracefully.
+import os
+
+bind = f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "true").lower() in ("1", "true", "yes", "on")
+# gunicorn takes whole seconds
+graceful_timeout = int(float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30")))
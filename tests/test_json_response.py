@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+from framework.serialization.json_response import streamed_response
+
+
+class Upstream(httpx.AsyncByteStream):
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        yield b'{"matchRequests": []}'
+
+    async def aclose(self):
+        self.closed = True
+
+
+def serve(response, send):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "asgi": {"version": "3.0"}}
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    return response(scope, receive, send)
+
+
+def test_streamed_response_forwards_the_body_and_closes_the_upstream():
+    async def run():
+        stream = Upstream()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await serve(streamed_response(httpx.Response(200, stream=stream)), send)
+        assert b"".join(message.get("body", b"") for message in sent) == b'{"matchRequests": []}'
+        assert stream.closed
+
+    asyncio.run(run())
+
+
+def test_streamed_response_closes_the_upstream_when_the_body_is_never_sent():
+    async def run():
+        stream = Upstream()
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with pytest.raises(OSError):
+            await serve(streamed_response(httpx.Response(200, stream=stream)), send)
+        assert stream.closed
+
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import jwt
+
+from framework.auth.jwt_verifier import JwtVerifier
+from framework.auth.key_sources import KeySource
+
+SECRET = "s" * 32
+
+
+class StaticKeySource(KeySource):
+
+    def __init__(self):
+        self.loads = 0
+
+    def load(self) -> str:
+        self.loads += 1
+        return SECRET
+
+
+def token(user_id="u1"):
+    return jwt.encode({"user_id": user_id, "exp": time.time() + 60}, SECRET, algorithm="HS256")
+
+
+def test_tokens_are_left_to_the_remote_check_until_the_keys_are_loaded():
+    async def run():
+        key_source = StaticKeySource()
+        verifier = JwtVerifier(key_source, ["HS256"], refresh_interval=0)
+
+        assert verifier.verify(token()) is None
+        assert key_source.loads == 0
+
+        await verifier.start()
+        assert verifier.verify(token()) == "u1"
+        await verifier.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services.match_status_broadcaster import MatchStatusBroadcaster
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FlakyMatchClient:
+    # fails in a way the broadcaster does not expect, then reports the match
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, url):
+        self.calls += 1
+        if self.calls == 1:
+            return Response(["not", "a", "status"])
+        return Response({"matchRequestId": "m1", "status": "matched", "partnerRequestId": "m2"})
+
+
+class Upstreams:
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, name):
+        return self.client
+
+
+def test_polling_survives_an_unexpected_error():
+    async def run():
+        client = FlakyMatchClient()
+        broadcaster = MatchStatusBroadcaster(http_clients=Upstreams(client), poll_interval=0)
+        statuses = [status async for status in broadcaster.watch("m1")]
+
+        assert [status.status for status in statuses] == ["matched"]
+        assert client.calls == 2
+        await broadcaster.close()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
@@ -0,0 +1,34 @@
+import asyncio
+
+from framework.cache.prefetcher import Prefetcher
+from framework.cache.sqlite_cache import SqliteCache
+
+
+def worker(path):
+    # what each gateway process builds over the shared file
+    return Prefetcher(SqliteCache(path, "prefetch"), epochs=SqliteCache(path, "prefetch_epochs"))
+
+
+def test_an_invalidation_in_another_worker_hides_its_prefetched_pages(tmp_path):
+    async def run():
+        path = str(tmp_path / "cache.sqlite3")
+        first, second = worker(path), worker(path)
+        loads = []
+
+        async def fetch(page):
+            loads.append(page)
+            return {"page": page, "version": len(loads)}
+
+        def has_next(result):
+            return result["page"] < 3
+
+        await first.get_page("favourites", 1, fetch, has_next, scope="u1")
+        await asyncio.gather(*first._in_flight.values())
+        assert loads == [1, 2]
+
+        second.invalidate("u1")
+        page = await first.get_page("favourites", 2, fetch, has_next, scope="u1")
+        assert page == {"page": 2, "version": 3}
+        assert first.hits == 0
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from framework.resilience.rate_limiter import InMemoryRateLimitBackend, RateLimiter
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_waits_for_the_refill():
+    clock = Clock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+
+    assert [backend.take("user:1", rate=2.0, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take("user:1", rate=2.0, burst=3) == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert backend.take("user:1", rate=2.0, burst=3) == 0.0
+    assert backend.take("user:1", rate=2.0, burst=3) > 0
+
+
+def test_buckets_are_per_key():
+    backend = InMemoryRateLimitBackend(clock=Clock())
+
+    assert backend.take("user:1", rate=1.0, burst=1) == 0.0
+    assert backend.take("user:1", rate=1.0, burst=1) > 0
+    assert backend.take("user:2", rate=1.0, burst=1) == 0.0
+
+
+def test_refilled_buckets_are_evicted():
+    clock = Clock()
+    backend = InMemoryRateLimitBackend(clock=clock)
+    backend.take("user:1", rate=1.0, burst=2)
+    backend.take("user:2", rate=1.0, burst=2)
+    assert len(backend) == 2
+
+    clock.now += 1.0
+    backend.take("user:3", rate=1.0, burst=2)
+    assert len(backend) == 1
+
+
+def test_least_recently_used_bucket_is_evicted_at_max_keys():
+    clock = Clock()
+    backend = InMemoryRateLimitBackend(max_keys=2, clock=clock)
+    backend.take("user:1", rate=1.0, burst=1)
+    backend.take("user:2", rate=1.0, burst=1)
+    backend.take("user:3", rate=1.0, burst=1)
+
+    assert len(backend) == 2
+    # user:1 starts over with a full bucket, user:3 is still limited
+    assert backend.take("user:1", rate=1.0, burst=1) == 0.0
+    assert backend.take("user:3", rate=1.0, burst=1) > 0
+
+
+def test_zero_rate_disables_the_limiter():
+    limiter = RateLimiter(InMemoryRateLimitBackend(clock=Clock()), rate=0, burst=1)
+
+    assert not limiter.enabled
+    assert asyncio.run(limiter.acquire("user:1")) == 0.0
+    assert len(limiter.backend) == 0
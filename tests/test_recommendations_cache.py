@@ -0,0 +1,68 @@
+import asyncio
+
+from app.models.recom_models import Recommendations
+from app.services.recommendations_cache import RecommendationsCache
+from framework.cache.json_codec import JsonCodec
+from framework.cache.sqlite_cache import SqliteCache
+
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {"userId": "u1", "games": []}
+
+
+class SlowRecomClient:
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def get(self, url, params=None):
+        self.started.set()
+        await self.release.wait()
+        return Response()
+
+
+class Upstreams:
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, name):
+        return self.client
+
+
+class Catalogue:
+
+    async def hydrate(self, games):
+        return games
+
+
+def worker(path, client):
+    # what each gateway process builds over the shared file
+    return RecommendationsCache(SqliteCache(path, "recommendations", codec=JsonCodec(models=[Recommendations])),
+                                http_clients=Upstreams(client), game_catalogue=Catalogue(),
+                                invalidations=SqliteCache(path, "recommendations_invalidations"))
+
+
+def test_an_invalidation_in_another_worker_stops_a_stale_fetch_being_stored(tmp_path):
+    async def run():
+        path = str(tmp_path / "cache.sqlite3")
+        client = SlowRecomClient()
+        first, second = worker(path, client), worker(path, client)
+
+        fetch = asyncio.create_task(first.get("u1", 6))
+        await client.started.wait()
+        second.invalidate("u1")
+        client.release.set()
+        await fetch
+
+        assert "u1" not in first.cache
+        assert "u1" not in second.cache
+
+        await first.get("u1", 6)
+        assert "u1" in second.cache
+
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+import asyncio
+
+import httpx
+import pytest
+
+from framework.clients.resilient_client import ResilientClient
+from framework.exceptions.response_exceptions import ResponseException
+from framework.resilience.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from framework.resilience import deadline
+from framework.resilience.concurrency_limiter import ConcurrencyLimiter
+from framework.resilience.retry_budget import RetryBudget
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def build_client(handler, clock, limit=0, max_retries=0):
+    breaker = CircuitBreaker("match", failure_threshold=1, recovery_timeout=10.0, clock=clock)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://match")
+    return ResilientClient(client, "match", breaker, RetryBudget(), max_retries=max_retries,
+                           limiter=ConcurrencyLimiter(limit))
+
+
+def open_then_cool_down(client, clock):
+    client.breaker.record_failure()
+    assert client.breaker.state == OPEN
+    clock.now += 11.0
+
+
+def test_breaker_opens_and_closes_again_after_a_successful_probe():
+    async def run():
+        clock = Clock()
+        status = 503
+        client = build_client(lambda request: httpx.Response(status), clock)
+
+        assert (await client.get("/games", coalesce=False)).status_code == 503
+        assert client.breaker.state == OPEN
+        with pytest.raises(ResponseException) as rejected:
+            await client.get("/games", coalesce=False)
+        assert rejected.value.status_code == 503
+
+        clock.now += 11.0
+        status = 200
+        assert (await client.get("/games", coalesce=False)).status_code == 200
+        assert client.breaker.state == CLOSED
+
+    asyncio.run(run())
+
+
+def test_shed_call_gives_back_the_half_open_probe():
+    async def run():
+        clock = Clock()
+        client = build_client(lambda request: httpx.Response(200), clock, limit=1)
+        open_then_cool_down(client, clock)
+
+        # the only slot is taken, so the probe is shed before reaching the upstream
+        await client.limiter.acquire()
+        with pytest.raises(ResponseException) as shed:
+            await client.get("/games", coalesce=False)
+        assert "overloaded" in shed.value.message
+        assert client.breaker.state == HALF_OPEN
+        assert client.breaker.half_open_calls == 0
+        client.limiter.release()
+
+        assert (await client.get("/games", coalesce=False)).status_code == 200
+        assert client.breaker.state == CLOSED
+
+    asyncio.run(run())
+
+
+def test_unexpected_error_gives_back_the_half_open_probe():
+    async def run():
+        clock = Clock()
+        fail = True
+
+        def handler(request):
+            if fail:
+                raise ValueError("bad request")
+            return httpx.Response(200)
+
+        client = build_client(handler, clock)
+        open_then_cool_down(client, clock)
+
+        with pytest.raises(ValueError):
+            await client.get("/games", coalesce=False)
+        assert client.breaker.half_open_calls == 0
+
+        fail = False
+        assert (await client.get("/games", coalesce=False)).status_code == 200
+        assert client.breaker.state == CLOSED
+
+    asyncio.run(run())
+
+
+def test_expired_deadline_during_half_open_leaves_the_probe_free():
+    async def run():
+        clock = Clock()
+        client = build_client(lambda request: httpx.Response(200), clock, limit=1)
+        open_then_cool_down(client, clock)
+
+        token = deadline.set_deadline(-1.0)
+        try:
+            with pytest.raises(ResponseException) as late:
+                await client.get("/games", coalesce=False)
+        finally:
+            deadline.reset_deadline(token)
+        assert late.value.status_code == 504
+        assert client.breaker.half_open_calls == 0
+
+        # then a shed probe, and the next call still gets through and closes the breaker
+        await client.limiter.acquire()
+        with pytest.raises(ResponseException):
+            await client.get("/games", coalesce=False)
+        client.limiter.release()
+        assert (await client.get("/games", coalesce=False)).status_code == 200
+        assert client.breaker.state == CLOSED
+
+    asyncio.run(run())
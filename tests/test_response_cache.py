@@ -0,0 +1,52 @@
+import asyncio
+
+from framework.cache.response_cache import ResponseCache, etag_matches
+from framework.resilience import deadline
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stale_entry_is_served_while_it_is_refreshed_past_the_request_deadline():
+    async def run():
+        clock = Clock()
+        cache = ResponseCache(ttl=10.0, stale_ttl=60.0, clock=clock)
+        bodies = iter([b"first", b"second"])
+        seen_deadlines = []
+
+        async def loader():
+            seen_deadlines.append(deadline.remaining())
+            return next(bodies)
+
+        assert (await cache.get_or_load("games", loader)).body == b"first"
+        clock.now += 11.0
+
+        token = deadline.set_deadline(0.01)
+        try:
+            assert (await cache.get_or_load("games", loader)).body == b"first"
+        finally:
+            deadline.reset_deadline(token)
+        while cache._background:
+            await asyncio.sleep(0)
+
+        assert seen_deadlines[-1] is None
+        assert (await cache.get_or_load("games", loader)).body == b"second"
+        assert cache.stale_hits == 1
+
+    asyncio.run(run())
+
+
+def test_etag_matches_weak_and_listed_tags():
+    cache_etag = '"abc"'
+    assert etag_matches('"abc"', cache_etag)
+    assert etag_matches('W/"abc"', cache_etag)
+    assert etag_matches('"xyz", "abc"', cache_etag)
+    assert etag_matches("*", cache_etag)
+    assert not etag_matches('"xyz"', cache_etag)
+    assert not etag_matches(None, cache_etag)
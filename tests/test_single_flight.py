@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from framework.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        assert await asyncio.gather(*(flight.do("games", load) for _ in range(5))) == [1] * 5
+        assert len(flight) == 0
+        assert await flight.do("games", load) == 2
+
+    asyncio.run(run())
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("games", load))
+        second = asyncio.create_task(flight.do("games", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+
+
+def test_failures_reach_every_caller_and_are_not_cached():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(flight.do("games", fail), flight.do("games", fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(flight) == 0
+
+    asyncio.run(run())
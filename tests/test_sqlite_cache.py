@@ -0,0 +1,91 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+from app.models.game import GameResponse
+from framework.cache.json_codec import JsonCodec
+from framework.cache.sqlite_cache import SqliteCache
+
+
+def game():
+    return GameResponse(gameId="g1", title="Chess", genre="board", links={"self": {"href": "/games/g1"}})
+
+
+def test_entries_round_trip_as_json(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SqliteCache(path, "games", codec=JsonCodec(models=[GameResponse]))
+    cache.set("g1", game())
+    cache.set(("page", 1), (2, b'{"games": []}'))
+
+    other_worker = SqliteCache(path, "games", codec=JsonCodec(models=[GameResponse]))
+    assert other_worker.get("g1") == game()
+    assert other_worker.get(("page", 1)) == (2, b'{"games": []}')
+    assert oct(os.stat(path).st_mode & 0o777) == oct(0o600)
+
+
+def test_a_planted_pickle_is_a_miss_and_never_loaded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SqliteCache(path, "tokens")
+    cache.set("token", "u1")
+
+    class Exploit:
+        def __reduce__(self):
+            return (os.system, ("touch " + str(tmp_path / "pwned"),))
+
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE cache_entries SET value = ?", (pickle.dumps(Exploit()),))
+    assert cache.get("token") is None
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_files_other_users_can_access_are_refused(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    path.touch(mode=0o666)
+    os.chmod(path, 0o666)
+    with pytest.raises(PermissionError):
+        SqliteCache(str(path), "tokens").get("token")
+
+
+def test_symlinks_are_refused(tmp_path):
+    target = tmp_path / "elsewhere.sqlite3"
+    target.touch()
+    os.chmod(target, 0o600)
+    (tmp_path / "cache.sqlite3").symlink_to(target)
+    with pytest.raises(PermissionError):
+        SqliteCache(str(tmp_path / "cache.sqlite3"), "tokens").get("token")
+
+
+def test_a_delete_that_finds_the_file_locked_is_retried_off_the_loop(tmp_path):
+    async def run():
+        path = str(tmp_path / "cache.sqlite3")
+        cache = SqliteCache(path, "tokens", busy_timeout=0.01)
+        cache.set("token", "u1")
+
+        writer = sqlite3.connect(path, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        assert cache.delete("token") is False
+        assert "token" in cache
+        await asyncio.sleep(0.05)
+        writer.execute("ROLLBACK")
+        writer.close()
+
+        while "token" in cache:
+            await asyncio.sleep(0.01)
+        assert cache.get("token") is None
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_stats_report_the_size_without_counting_on_the_loop(tmp_path):
+    async def run():
+        cache = SqliteCache(str(tmp_path / "cache.sqlite3"), "tokens")
+        cache.set("a", "u1")
+        cache.set("b", "u2")
+        cache.stats()
+        await cache._pruning
+        assert cache.stats()["size"] == 2
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from framework.queues.write_behind import WriteBehindQueue
+
+
+class Sink:
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, batch):
+        self.started.set()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        await self.release.wait()
+        self.batches.append(list(batch))
+        return []
+
+
+def spilled_items(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_full_queue_refuses_items_instead_of_spilling(tmp_path):
+    async def run():
+        spill = tmp_path / "spill.jsonl"
+        sink = Sink()
+        queue = WriteBehindQueue(sink, max_size=1, batch_size=1, flush_interval=0, spill_path=str(spill))
+
+        assert await queue.put({"n": 1})
+        await sink.started.wait()
+        assert await queue.put({"n": 2})
+        assert not await queue.put({"n": 3})
+        assert queue.rejected == 1
+        assert spilled_items(spill) == []
+
+        sink.release.set()
+        await queue.close()
+        assert sink.batches == [[{"n": 1}], [{"n": 2}]]
+
+    asyncio.run(run())
+
+
+def test_close_spills_the_batch_being_delivered(tmp_path):
+    async def run():
+        spill = tmp_path / "spill.jsonl"
+        sink = Sink()
+        queue = WriteBehindQueue(sink, batch_size=2, flush_interval=0, spill_path=str(spill))
+
+        await queue.put({"n": 1})
+        await queue.put({"n": 2})
+        await sink.started.wait()
+        await queue.put({"n": 3})
+        await queue.close(timeout=0.01)
+
+        assert sorted(item["n"] for item in spilled_items(spill)) == [1, 2, 3]
+        assert queue.dropped == 0
+
+    asyncio.run(run())
+
+
+def test_items_given_up_on_are_spilled_and_replayed_on_start(tmp_path):
+    async def run():
+        spill = tmp_path / "spill.jsonl"
+        failing = WriteBehindQueue(Sink(fail=True), flush_interval=0, max_retries=1, backoff_base=0,
+                                   spill_path=str(spill))
+        await failing.put({"n": 1})
+        await failing.close()
+        assert spilled_items(spill) == [{"n": 1}]
+
+        sink = Sink()
+        sink.release.set()
+        queue = WriteBehindQueue(sink, flush_interval=0, spill_path=str(spill))
+        queue.start()
+        await sink.started.wait()
+        await queue.close()
+        assert sink.batches == [[{"n": 1}]]
+        assert not spill.exists()
+
+    asyncio.run(run())